@@ -0,0 +1,44 @@
+"""
+DPoP proof generation rate of the pooled keys with pre-serialized JWK headers,
+compared with generating a new key and building the JWK for every request.
+
+Usage (from the project root):
+    python -m benchmark.dpop_headers [-n 500]
+"""
+import argparse
+import time
+from uuid import uuid4
+
+import ecdsa
+
+from common.utils.jwt import DPoPKeyPool, generate_dpop
+
+URL = "https://api.mercari.jp/v2/entities:search"
+
+
+def per_request_key():
+    return generate_dpop(
+        url=URL,
+        method="POST",
+        key=ecdsa.SigningKey.generate(ecdsa.NIST256p),
+        extra_payload={"uuid": str(uuid4())},
+    )
+
+
+def measure(make_header, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        make_header()
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--headers", type=int, default=500)
+    args = parser.parse_args()
+
+    pool = DPoPKeyPool()
+    before = measure(per_request_key, args.headers)
+    after = measure(lambda: pool.sign(URL, "POST", {"uuid": str(uuid4())}), args.headers)
+    print(f"new key per request  {before:8.1f} headers/s")
+    print(f"pooled keys          {after:8.1f} headers/s   x{after / before:4.1f}")
@@ -0,0 +1,61 @@
+"""
+Memory held by the SearchResultItem objects of one large crawl, compared
+with the previous __dict__-based layout.
+
+Usage (from the project root):
+    python -m benchmark.item_memory [-n 24000]
+"""
+import argparse
+import tracemalloc
+
+from website.base.search_result_item import SearchResultItem
+
+
+class DictItem:
+    """The previous layout: a regular class with a per-instance __dict__ and float price."""
+
+    def __init__(self, site, id, name, product_url, image_url, status, price):
+        self.site = site
+        self.id = id
+        self.name = name
+        self.price = float(price) if price else 0
+        self.price_change = 0
+        self.pre_price = None
+        self._product_url = product_url
+        self._image_url = image_url
+        self.status = status
+
+
+def crawl(size):
+    # 模拟接口返回：每个商品的站点名和价格都是新构造的对象
+    for i in range(size):
+        yield (
+            "".join(["mer", "cari"]),
+            f"m{10_000_000_000 + i}",
+            f"商品 {i}",
+            None,
+            None,
+            1,
+            str(1000 + i),
+        )
+
+
+def measure(cls, size):
+    tracemalloc.start()
+    items = [cls(*row) for row in crawl(size)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--items", type=int, default=24_000)
+    args = parser.parse_args()
+
+    before = measure(DictItem, args.items)
+    after = measure(SearchResultItem, args.items)
+    print(f"{args.items} items")
+    print(f"__dict__ layout  {before / 1024 / 1024:7.2f} MiB  {before / args.items:6.1f} B/item")
+    print(f"__slots__ layout {after / 1024 / 1024:7.2f} MiB  {after / args.items:6.1f} B/item")
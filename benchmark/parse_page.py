@@ -0,0 +1,91 @@
+"""
+Per-page parse cost of the synchronous batch extraction path versus the
+legacy path that awaits every async get_item_* getter in its own task.
+
+Usage (from the project root):
+    python -m benchmark.parse_page [-n 200]
+"""
+import argparse
+import asyncio
+import functools
+import time
+
+from website import MercariSearch, Suruga
+from website.base.html_plan import parse_html
+from website.suruga import CARDS
+
+
+def mercari_page(size=120):
+    return [
+        {
+            "id": f"m{10_000_000_000 + i}",
+            "name": f"商品 {i}",
+            "price": str(1000 + i),
+            "status": "ITEM_STATUS_ON_SALE",
+            "thumbnails": [f"https://static.mercdn.net/thumb/{i}.jpg"],
+        }
+        for i in range(size)
+    ]
+
+
+def suruga_page(size=24):
+    cards = "".join(
+        f"""
+        <div class="item"><div class="item_detail">
+          <p class="title"><a href="https://www.suruga-ya.jp/product/detail/{600000 + i}">商品 {i}</a></p>
+          <div class="item_price"><p class="price_teika">中古：<strong>￥{1000 + i:,}</strong></p></div>
+        </div></div>"""
+        for i in range(size)
+    )
+    return f'<html><body><div class="hit">該当件数:{size}件中</div>{cards}</body></html>'
+
+
+def with_async_getters(cls):
+    """Subclass whose get_item_* are coroutines, which forces the legacy per-item path."""
+
+    def wrap(getter):
+        @functools.wraps(getter)
+        async def async_getter(self, *args, **kwargs):
+            return getter(self, *args, **kwargs)
+
+        return async_getter
+
+    namespace = {
+        name: wrap(getattr(cls, name)) for name in dir(cls) if name.startswith("get_item_")
+    }
+    return type(f"Async{cls.__name__}", (cls,), namespace)
+
+
+async def measure(scraper, make_items, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        products = await scraper.parse_items(make_items())
+    elapsed = (time.perf_counter() - start) / rounds * 1000
+    return elapsed, len(products)
+
+
+async def main(rounds):
+    mercari_items = mercari_page()
+    suruga_html = suruga_page()
+    cases = [
+        ("mercari (120 items)", MercariSearch, lambda: mercari_items),
+        (
+            "suruga (24 items)",
+            Suruga,
+            lambda: CARDS(parse_html(suruga_html.encode())),
+        ),
+    ]
+    for label, cls, make_items in cases:
+        before, count = await measure(with_async_getters(cls)(None), make_items, rounds)
+        after, _ = await measure(cls(None), make_items, rounds)
+        print(
+            f"{label:<22} async getters {before:7.3f} ms/page   "
+            f"batch {after:7.3f} ms/page   x{before / after:4.1f}   ({count} products)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds))
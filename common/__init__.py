@@ -2,4 +2,4 @@ from .config import Config
 from .database import ProductDatabase
 from .logger import setup_logger
 from .notify import TelegramClient, WecomClient
-from .http_client import AsyncHTTPXClient, AsyncAIOHTTPClient
+from .http_client import AsyncHTTPXClient, AsyncAIOHTTPClient, HostGovernor
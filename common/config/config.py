@@ -116,6 +116,24 @@ class Config:
                 )
                 search_config.setdefault("delay", delay)
 
+                # 获取并设置'adaptive_delay'
+                adaptive_delay = cls.get_config_value(
+                    config_sources, "adaptive_delay", config_default.ADAPTIVE_DELAY
+                )
+                search_config.setdefault("adaptive_delay", adaptive_delay)
+
+                # 获取并设置'min_delay'
+                min_delay = cls.get_config_value(
+                    config_sources, "min_delay", config_default.MIN_DELAY
+                )
+                search_config.setdefault("min_delay", min_delay)
+
+                # 获取并设置'max_delay'
+                max_delay = cls.get_config_value(
+                    config_sources, "max_delay", config_default.MAX_DELAY
+                )
+                search_config.setdefault("max_delay", max_delay)
+
                 # 获取并设置'exchange_rate'
                 exchange_rate = cls.get_config_value(
                     config_sources, "exchange_rate", config_default.EXCHANGE_RATE
@@ -144,6 +162,60 @@ class Config:
                 )
                 search_config.setdefault("max_concurrency", max_concurrency)
 
+                # 获取并设置'rate_limit'
+                rate_limit = cls.get_config_value(
+                    config_sources, "rate_limit", config_default.RATE_LIMIT
+                )
+                search_config.setdefault("rate_limit", rate_limit)
+
+                # 获取并设置'max_inflight'
+                max_inflight = cls.get_config_value(
+                    config_sources, "max_inflight", config_default.MAX_INFLIGHT
+                )
+                search_config.setdefault("max_inflight", max_inflight)
+
+                # 获取并设置'stream_pages'
+                stream_pages = cls.get_config_value(
+                    config_sources, "stream_pages", config_default.STREAM_PAGES
+                )
+                search_config.setdefault("stream_pages", stream_pages)
+
+                # 获取并设置'incremental_crawl'
+                incremental_crawl = cls.get_config_value(
+                    config_sources, "incremental_crawl", config_default.INCREMENTAL_CRAWL
+                )
+                search_config.setdefault("incremental_crawl", incremental_crawl)
+
+                # 获取并设置'full_sweep_interval'
+                full_sweep_interval = cls.get_config_value(
+                    config_sources,
+                    "full_sweep_interval",
+                    config_default.FULL_SWEEP_INTERVAL,
+                )
+                search_config.setdefault("full_sweep_interval", full_sweep_interval)
+
+                # 获取并设置'score_sweep_interval'
+                score_sweep_interval = cls.get_config_value(
+                    config_sources,
+                    "score_sweep_interval",
+                    config_default.SCORE_SWEEP_INTERVAL,
+                )
+                search_config.setdefault("score_sweep_interval", score_sweep_interval)
+
+                # 获取并设置'history_retention_days'
+                history_retention_days = cls.get_config_value(
+                    config_sources,
+                    "history_retention_days",
+                    config_default.HISTORY_RETENTION_DAYS,
+                )
+                search_config.setdefault("history_retention_days", history_retention_days)
+
+                # 获取并设置'prune_after_days'
+                prune_after_days = cls.get_config_value(
+                    config_sources, "prune_after_days", config_default.PRUNE_AFTER_DAYS
+                )
+                search_config.setdefault("prune_after_days", prune_after_days)
+
                 # 获取并设置'msg_tpl'
                 msg_tpl = cls.get_config_value(
                     config_sources, "msg_tpl", config_default.MESSAGE_TEMPLATE
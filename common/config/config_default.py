@@ -13,6 +13,15 @@ NOTIFY_MAPPING = {1: "telegram_1", 2: "telegram_2", 3: "wecom_1"}
 # 默认延迟
 DEFAULT_DELAY = 1200
 
+# 默认是否根据关键词的变化频率自动调整监控间隔
+ADAPTIVE_DELAY = False
+
+# 默认自适应监控间隔的下限（秒）
+MIN_DELAY = 60
+
+# 默认自适应监控间隔的上限（秒）
+MAX_DELAY = 2 * 60 * 60
+
 # 默认日汇
 EXCHANGE_RATE = 0.050
 
@@ -25,6 +34,30 @@ USER_DEFAULT_MAX_PAGES = 20
 # 默认最大并发数
 MAX_CONCURRENCY = 10
 
+# 默认每个网站每秒最多发出的请求数（所有用户、所有关键词共享），0 表示不限制
+RATE_LIMIT = 10
+
+# 默认每个网站同时进行的请求数上限（所有用户、所有关键词共享），0 表示不限制
+MAX_INFLIGHT = 20
+
+# 默认是否按页流式处理搜索结果
+STREAM_PAGES = True
+
+# 默认是否对按上新时间排序的站点增量抓取
+INCREMENTAL_CRAWL = True
+
+# 默认增量抓取时全量抓取的间隔（秒）
+FULL_SWEEP_INTERVAL = 6 * 60 * 60
+
+# 默认煤炉增量抓取时按推荐排序抓取的间隔（秒）
+SCORE_SWEEP_INTERVAL = 60 * 60
+
+# 默认价格历史保留天数
+HISTORY_RETENTION_DAYS = 180
+
+# 默认商品未在搜索结果中出现多少天后从数据库清理，0 表示不清理
+PRUNE_AFTER_DAYS = 90
+
 # 默认消息发送模板
 MESSAGE_TEMPLATE = """
 【$priceStatus】$productName
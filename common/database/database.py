@@ -1,53 +1,121 @@
+import asyncio
+import hashlib
 import sqlite3
 import os
-from typing import Tuple, Optional
+import time
+from concurrent.futures import Future
+from typing import Dict, Tuple, Optional
 
 from loguru import logger
 
 from ..utils import extract_keyword_from_url
+from ..utils.url_codec import get_url_codec
+from .migrations import migrate
+from .state_cache import KeywordStateCache
+from .storage_engine import StorageEngine
 
 
 class ProductDatabase:
     # SQL 语句集中管理
     SQL_STATEMENTS = {
-        "create_website_keywords_table": """
-            -- 创建一个用于存储网站关键词的表
-            -- 如果表已存在，则此操作不会有任何效果
-            CREATE TABLE IF NOT EXISTS website_keywords (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,  -- 主键，自动递增
-                website TEXT NOT NULL,                 -- 网站名
-                keyword TEXT NOT NULL,                 -- 关键词
-                product_count_1 INTEGER DEFAULT 0,     -- 统计 status 为 1, 2, 3 的商品数量
-                product_count_2 INTEGER DEFAULT 0,     -- 统计 status 为 0 的商品数量
-                UNIQUE(website, keyword)               -- 确保每个网站和关键词的组合是唯一的
-            );
-        """,
-        "create_products_table": """
-            -- 创建一个用于存储产品信息的表
-            -- 如果表已存在，则此操作不会有任何效果
-            CREATE TABLE IF NOT EXISTS products (
-                id TEXT NOT NULL,                      -- 产品 ID
-                keyword_id INTEGER NOT NULL,           -- 关联的关键词 ID
-                name TEXT,                             -- 产品名
-                price REAL NOT NULL,                   -- 价格
-                image_url TEXT,                        -- 图片 URL
-                product_url TEXT,                      -- 产品 URL
-                status INTEGER,                        -- 产品状态
-                PRIMARY KEY (id, keyword_id),          -- 将产品 ID 和关键词 ID 一起作为主键
-                FOREIGN KEY (keyword_id) REFERENCES website_keywords (id) -- 外键关联到 website_keywords 表
-            );
-        """,
-        "upsert_product": """
-            -- 插入或更新产品信息
-            -- 如果具有相同的产品 ID 和关键词 ID 的记录已存在，则更新该记录
-            INSERT INTO products (id, keyword_id, price, name, image_url, product_url, status) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id, keyword_id) DO UPDATE SET
+        "upsert_item": """
+            -- 插入或更新商品信息，每个网站的每个商品只保存一份
+            -- 内容没有变化时不改写该行，多个关键词在同一轮看到同一商品时只会真正写入一次
+            -- fingerprint 是 price/name/image_url/product_url/status 的哈希，相同即内容未变
+            INSERT INTO items (website, id, price, name, image_url, product_url, status, fingerprint)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(website, id) DO UPDATE SET
             price = excluded.price,
             name = excluded.name,
             image_url = excluded.image_url,
             product_url = excluded.product_url,
-            status = excluded.status;
+            status = excluded.status,
+            fingerprint = excluded.fingerprint
+            WHERE fingerprint IS NOT excluded.fingerprint;
+        """,
+        "upsert_keyword_item": """
+            -- 插入或更新关键词与商品的关联，以及该关键词看到的价格、状态和时间
+            INSERT INTO keyword_items (keyword_id, item_id, price, status, last_seen_at)
+            SELECT ?, item_id, ?, ?, ? FROM items WHERE website = ? AND id = ?
+            ON CONFLICT(keyword_id, item_id) DO UPDATE SET
+            price = excluded.price,
+            status = excluded.status,
+            last_seen_at = excluded.last_seen_at;
+        """,
+        "discount_stale_product_counts": """
+            -- 在清理前，从产品计数中扣除即将被删除的关联
+            UPDATE website_keywords
+            SET product_count_1 = product_count_1 - (
+                    SELECT COUNT(*) FROM keyword_items
+                    WHERE keyword_id = website_keywords.id AND last_seen_at < ? AND status IN (1, 2, 3)),
+                product_count_2 = product_count_2 - (
+                    SELECT COUNT(*) FROM keyword_items
+                    WHERE keyword_id = website_keywords.id AND last_seen_at < ? AND status = 0)
+            WHERE website = ?;
+        """,
+        "select_stale_keyword_ids": """
+            -- 找出包含长期未出现商品的关键词
+            SELECT DISTINCT ki.keyword_id FROM keyword_items ki
+            JOIN website_keywords k ON k.id = ki.keyword_id
+            WHERE ki.last_seen_at < ? AND k.website = ?;
+        """,
+        "delete_stale_keyword_items": """
+            -- 删除指定网站下长期未出现的关键词关联
+            DELETE FROM keyword_items
+            WHERE last_seen_at < ?
+              AND keyword_id IN (SELECT id FROM website_keywords WHERE website = ?);
+        """,
+        "delete_orphan_price_history": """
+            -- 删除不再属于任何关键词的商品的价格历史
+            DELETE FROM price_history
+            WHERE item_id NOT IN (SELECT item_id FROM keyword_items);
+        """,
+        "delete_orphan_items": """
+            -- 删除不再属于任何关键词的商品
+            DELETE FROM items
+            WHERE item_id NOT IN (SELECT item_id FROM keyword_items);
+        """,
+        "insert_changed_price_history": """
+            -- 在更新 items 之前执行：商品已存在且价格或状态与保存的不同时，追加一条历史记录
+            -- 多个关键词在同一轮看到同一变化时只会记录一次
+            INSERT OR REPLACE INTO price_history (item_id, recorded_at, price, status)
+            SELECT item_id, ?, ?, ? FROM items
+            WHERE website = ? AND id = ? AND (price != ? OR status IS NOT ?);
+        """,
+        "insert_first_price_history": """
+            -- 在更新 items 之后执行：商品还没有任何历史记录时（新品），追加第一条历史记录
+            INSERT OR IGNORE INTO price_history (item_id, recorded_at, price, status)
+            SELECT item_id, ?, ?, ? FROM items
+            WHERE website = ? AND id = ?
+              AND NOT EXISTS (SELECT 1 FROM price_history h WHERE h.item_id = items.item_id);
+        """,
+        "select_lowest_price": """
+            -- 查询商品在指定时间之后在售时的最低价格，走 price_history 的主键范围扫描
+            SELECT MIN(h.price) FROM price_history h
+            JOIN items i ON i.item_id = h.item_id
+            WHERE i.website = ? AND i.id = ? AND h.recorded_at >= ?
+              AND h.price > 0 AND h.status IS NOT 0;
+        """,
+        "downsample_price_history": """
+            -- 将早于指定时间的历史记录降采样为每个商品每天一条（保留当天的最低价）
+            DELETE FROM price_history
+            WHERE recorded_at < ?
+              AND (item_id, recorded_at) NOT IN (
+                  SELECT item_id, recorded_at FROM (
+                      SELECT item_id, recorded_at,
+                             ROW_NUMBER() OVER (
+                                 PARTITION BY item_id, recorded_at / 86400
+                                 ORDER BY price, recorded_at
+                             ) AS rn
+                      FROM price_history WHERE recorded_at < ?
+                  ) WHERE rn = 1
+              );
+        """,
+        "expire_price_history": """
+            -- 删除指定网站早于保留期限的历史记录
+            DELETE FROM price_history
+            WHERE recorded_at < ?
+              AND item_id IN (SELECT item_id FROM items WHERE website = ?);
         """,
         "insert_or_ignore_keyword": """
             -- 插入新的网站和关键词对
@@ -58,48 +126,126 @@ class ProductDatabase:
             -- 根据网站名和关键词选择关键词 ID
             SELECT id FROM website_keywords WHERE website = ? AND keyword = ?;
         """,
-        "update_product_count": """
-            -- 更新特定关键词 ID 的产品计数
-            UPDATE website_keywords 
-            SET product_count_1 = (SELECT COUNT(*) FROM products WHERE keyword_id = ? AND status IN (1, 2, 3)),
-                product_count_2 = (SELECT COUNT(*) FROM products WHERE keyword_id = ? AND status = 0)
+        "select_event_rate": """
+            -- 获取关键词变化事件频率的 EWMA（每秒事件数）
+            SELECT event_rate FROM website_keywords WHERE id = ?;
+        """,
+        "update_event_rate": """
+            -- 保存关键词变化事件频率的 EWMA
+            UPDATE website_keywords SET event_rate = ? WHERE id = ?;
+        """,
+        "select_crawl_state": """
+            -- 获取关键词首轮抓取时的搜索条件哈希和最近一次完成抓取的时间
+            SELECT baseline_hash, last_crawled_at FROM website_keywords WHERE id = ?;
+        """,
+        "update_crawl_state": """
+            -- 保存关键词的抓取状态
+            UPDATE website_keywords SET baseline_hash = ?, last_crawled_at = ? WHERE id = ?;
+        """,
+        "increment_product_count": """
+            -- 按状态变化的增量更新特定关键词 ID 的产品计数
+            UPDATE website_keywords
+            SET product_count_1 = product_count_1 + ?,
+                product_count_2 = product_count_2 + ?
             WHERE id = ?;
         """,
+        "recount_product_counts": """
+            -- 全量重新统计所有关键词的产品计数，用于修复计数漂移
+            UPDATE website_keywords
+            SET product_count_1 = (SELECT COUNT(*) FROM keyword_items WHERE keyword_id = website_keywords.id AND status IN (1, 2, 3)),
+                product_count_2 = (SELECT COUNT(*) FROM keyword_items WHERE keyword_id = website_keywords.id AND status = 0);
+        """,
+        "select_product_count_drift": """
+            -- 找出计数与实际产品数量不一致的关键词
+            SELECT k.id, k.website, k.keyword,
+                   k.product_count_1, COALESCE(SUM(p.status IN (1, 2, 3)), 0),
+                   k.product_count_2, COALESCE(SUM(p.status = 0), 0)
+            FROM website_keywords k
+            LEFT JOIN keyword_items p ON p.keyword_id = k.id
+            GROUP BY k.id
+            HAVING k.product_count_1 != COALESCE(SUM(p.status IN (1, 2, 3)), 0)
+                OR k.product_count_2 != COALESCE(SUM(p.status = 0), 0);
+        """,
         "count_products_by_keyword": """
             -- 计算特定关键词的产品总数
-            SELECT COUNT(*) FROM products WHERE keyword_id = ?;
+            SELECT COUNT(*) FROM keyword_items WHERE keyword_id = ?;
+        """,
+        "select_keyword_states": """
+            -- 获取特定关键词下所有产品的价格、状态和商品指纹，用于加载状态缓存
+            SELECT i.id, k.price, k.status, k.last_seen_at, i.fingerprint
+            FROM keyword_items k JOIN items i ON i.item_id = k.item_id
+            WHERE k.keyword_id = ?;
         """,
-        "bulk_fetch_prices": """
-            -- 批量获取一系列产品的价格
-            -- 使用参数替换来构建查询的 IN 子句
-            SELECT id, price FROM products WHERE (id, keyword_id) IN ({});
+        "select_item": """
+            -- 获取单个商品的信息
+            SELECT name, price, image_url, product_url, status FROM items WHERE website = ? AND id = ?;
+        """,
+        "select_all_states": """
+            -- 按关键词顺序获取所有产品的价格、状态和商品指纹，用于启动时预热状态缓存
+            SELECT k.keyword_id, i.id, k.price, k.status, k.last_seen_at, i.fingerprint
+            FROM keyword_items k JOIN items i ON i.item_id = k.item_id
+            ORDER BY k.keyword_id;
         """,
     }
 
-    def __init__(self, db_name: str):
+    # 状态缓存默认最多保存的商品条目数
+    STATE_CACHE_MAX_ENTRIES = 500_000
+
+    # 早于该天数的价格历史会被降采样为每天一条
+    HISTORY_DOWNSAMPLE_AFTER_DAYS = 7
+
+    # 商品未变化时 last_seen_at 的刷新间隔（秒），避免每轮都改写所有关联
+    LAST_SEEN_RESOLUTION = 24 * 60 * 60
+
+    # 每次增量 VACUUM 回收的页数
+    INCREMENTAL_VACUUM_PAGES = 256
+
+    def __init__(self, db_name: str, state_cache_max_entries: Optional[int] = None):
         """
-        初始化 ProductDatabase 实例。
+        初始化 ProductDatabase 实例。所有 SQL 都交给该数据库文件的 StorageEngine 写线程执行，
+        使用前需要先 await initialize()。
 
         :param db_name: 数据库的文件名。
+        :param state_cache_max_entries: 状态缓存最多保存的商品条目数，默认为 STATE_CACHE_MAX_ENTRIES。
         """
         db_dir = os.path.dirname(db_name)
         if not os.path.exists(db_dir):
             os.makedirs(db_dir)
         self.db_name = db_name
-        self.conn = sqlite3.connect(self.db_name, check_same_thread=False)
-        self.setup_database()
+        self.engine = StorageEngine.acquire(self.db_name)
+        self.state_cache = KeywordStateCache(
+            state_cache_max_entries or self.STATE_CACHE_MAX_ENTRIES
+        )
+        self._keyword_ids: Dict[Tuple[str, str], int] = {}
 
-    def setup_database(self):
-        """创建数据库表格，如果它们不存在的话。"""
-        self._safe_execute("create_website_keywords_table")
-        self._safe_execute("create_products_table")
+    async def initialize(self, warm_cache: bool = True):
+        """
+        在写线程中创建数据库表格并预热状态缓存。
+
+        :param warm_cache: 是否预热状态缓存，离线维护工具不需要。
+        """
+        await self.engine.run(self.setup_database)
+        if warm_cache:
+            await self._warm_state_cache()
+
+    def setup_database(self, conn: sqlite3.Connection):
+        """创建数据库表格，并将旧版本的数据库原地升级到最新的 schema 版本。"""
+        start, current = migrate(conn)
+        if start != current:
+            logger.info(f"Database {self.db_name} migrated from version {start} to {current}")
 
     def _safe_execute(
-        self, query_key: str, params: Tuple = (), fetch_one=False, fetch_all=False
+        self,
+        conn: sqlite3.Connection,
+        query_key: str,
+        params: Tuple = (),
+        fetch_one=False,
+        fetch_all=False,
     ):
         """
-        安全地执行数据库查询，并处理任何数据库异常。
+        安全地执行数据库查询，并处理任何数据库异常。只能在写线程中调用。
 
+        :param conn: 写线程的数据库连接。
         :param query_key: SQL_STATEMENTS 字典中的键，用于指定要执行的 SQL 语句。
         :param params: 传递给 SQL 语句的参数。
         :param fetch_one: 如果为 True，则只返回查询的第一行。
@@ -108,7 +254,7 @@ class ProductDatabase:
         """
         query = self.SQL_STATEMENTS[query_key]
         try:
-            cursor = self.conn.execute(query, params)
+            cursor = conn.execute(query, params)
             if fetch_one:
                 return cursor.fetchone()
             if fetch_all:
@@ -118,63 +264,181 @@ class ProductDatabase:
             logger.error(f"Database error: {e}")
             return None
 
-    def insert_or_ignore_keyword(self, website: str, keyword: str):
+    def insert_or_ignore_keyword(self, conn: sqlite3.Connection, website: str, keyword: str):
         """
         插入一个新的 website 和 keyword 对，如果它们已存在，则忽略此操作。
 
+        :param conn: 写线程的数据库连接。
+        :param website: 网站名。
+        :param keyword: 关键词。
+        """
+        self._safe_execute(conn, "insert_or_ignore_keyword", (website, keyword))
+
+    async def get_keyword_id(self, website: str, keyword: str) -> Optional[int]:
+        """
+        根据给定的网站名和关键词获取关键词 ID，不存在时先插入。结果会被缓存在内存中。
+
         :param website: 网站名。
         :param keyword: 关键词。
+        :return: 对应的关键词 ID，如果未找到则返回 0。
         """
-        self._safe_execute("insert_or_ignore_keyword", (website, keyword))
+        keyword_id = self._keyword_ids.get((website, keyword))
+        if keyword_id:
+            return keyword_id
+
+        def select_keyword_id(conn):
+            self.insert_or_ignore_keyword(conn, website, keyword)
+            return self._safe_execute(
+                conn, "select_keyword_id", (website, keyword), fetch_one=True
+            )
+
+        result = await self.engine.run(select_keyword_id)
+        keyword_id = result[0] if isinstance(result, tuple) and result else 0
+        if keyword_id:
+            self._keyword_ids[(website, keyword)] = keyword_id
+        return keyword_id
 
-    def get_keyword_id(self, website: str, keyword: str) -> Optional[int]:
+    async def get_event_rate(self, website: str, keyword: str) -> Optional[float]:
         """
-        根据给定的网站名和关键词获取关键词 ID。
+        获取关键词保存的变化事件频率，用于自适应监控间隔在重启后恢复。
 
         :param website: 网站名。
         :param keyword: 关键词。
-        :return: 对应的关键词 ID，如果未找到则返回 None。
+        :return: 每秒变化事件数的 EWMA，没有记录时返回 None。
         """
-        result = self._safe_execute(
-            "select_keyword_id", (website, keyword), fetch_one=True
+        keyword_id = await self.get_keyword_id(website, extract_keyword_from_url(keyword))
+        row = await self.engine.run(
+            lambda conn: self._safe_execute(
+                conn, "select_event_rate", (keyword_id,), fetch_one=True
+            )
         )
-        return result[0] if isinstance(result, tuple) and result else 0
+        return row[0] if row else None
 
-    def update_product_count(self, keyword_id):
+    async def save_event_rate(self, website: str, keyword: str, event_rate: float):
         """
-        更新特定关键词 ID 的产品数量。
+        保存关键词的变化事件频率（write-behind）。
 
-        :param keyword_id: 关键词 ID。
+        :param website: 网站名。
+        :param keyword: 关键词。
+        :param event_rate: 每秒变化事件数的 EWMA。
         """
-        self._safe_execute("update_product_count", (keyword_id, keyword_id, keyword_id))
+        keyword_id = await self.get_keyword_id(website, extract_keyword_from_url(keyword))
+        self.engine.submit(
+            self.SQL_STATEMENTS["update_event_rate"], [(event_rate, keyword_id)]
+        )
+
+    async def get_crawl_state(
+        self, website: str, keyword: str
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        获取关键词的抓取状态，用于重启后判断是否需要重新进行首轮全量抓取。
+
+        :param website: 网站名。
+        :param keyword: 关键词。
+        :return: (首轮抓取时的搜索条件哈希, 最近一次完成抓取的 Unix 时间戳)，没有记录时为 (None, None)。
+        """
+        keyword_id = await self.get_keyword_id(website, extract_keyword_from_url(keyword))
+        row = await self.engine.run(
+            lambda conn: self._safe_execute(
+                conn, "select_crawl_state", (keyword_id,), fetch_one=True
+            )
+        )
+        return tuple(row) if row else (None, None)
 
-    def upsert_products(
-        self, items, keyword: str, website: str, push_price_changes: bool
+    async def save_crawl_state(
+        self, website: str, keyword: str, baseline_hash: int, crawled_at: int
     ):
         """
-        插入或更新产品信息。
+        保存关键词的抓取状态（write-behind），在每轮监控完成后调用。
+
+        :param website: 网站名。
+        :param keyword: 关键词。
+        :param baseline_hash: 首轮抓取时的搜索条件哈希。
+        :param crawled_at: 本轮完成的 Unix 时间戳。
+        """
+        keyword_id = await self.get_keyword_id(website, extract_keyword_from_url(keyword))
+        self.engine.submit(
+            self.SQL_STATEMENTS["update_crawl_state"],
+            [(baseline_hash, crawled_at, keyword_id)],
+        )
+
+    @staticmethod
+    def count_bucket(status) -> Optional[int]:
+        """
+        返回商品状态所属的计数列。
+
+        :param status: 商品状态。
+        :return: 1 表示 product_count_1（status 为 1, 2, 3），2 表示 product_count_2（status 为 0），其他状态不计数。
+        """
+        if status in (1, 2, 3):
+            return 1
+        if status == 0:
+            return 2
+        return None
+
+    def recount_product_counts(self, conn: sqlite3.Connection):
+        """
+        根据 keyword_items 表全量重新统计所有关键词的产品计数。只在离线修复计数漂移时使用。
+
+        :param conn: 写线程的数据库连接。
+        """
+        self._safe_execute(conn, "recount_product_counts")
+
+    def verify_product_counts(self, conn: sqlite3.Connection) -> list:
+        """
+        校验所有关键词的产品计数与 keyword_items 表中的实际数量是否一致。
+
+        :param conn: 写线程的数据库连接。
+        :return: 计数不一致的关键词列表，每项为
+            (id, website, keyword, product_count_1, 实际数量1, product_count_2, 实际数量2)。
+        """
+        return self._safe_execute(conn, "select_product_count_drift", fetch_all=True) or []
+
+    async def upsert_products(
+        self,
+        items,
+        keyword: str,
+        website: str,
+        push_price_changes: bool,
+        counts: Optional[Dict[str, int]] = None,
+    ):
+        """
+        插入或更新产品信息。与数据库现有状态的比对完全在内存中完成，写入交给写线程异步执行。
 
         :param items: 包含产品信息的列表。
         :param keyword: 关联的关键词。
         :param website: 关联的网站。
         :param push_price_changes: 是否推送价格变化的商品。
+        :param counts: 可选，累加本次比对的 new、price_changed、restocked 数量，不受 push_price_changes 影响。
         :yield: 处理后的每个产品信息。
         """
         keyword = extract_keyword_from_url(keyword)
         logger.info(f"{website}: {keyword}   搜索商品数量: {len(items)}")
 
-        self.insert_or_ignore_keyword(website, keyword)
-        keyword_id = self.get_keyword_id(website, keyword)
+        # 没有解析出 ID 的商品无法写入（items.id 不能为 NULL），会导致整批写入失败
+        valid_items = [item for item in items if item.id]
+        if len(valid_items) != len(items):
+            logger.warning(f"{website}: {keyword}   跳过 {len(items) - len(valid_items)} 个没有 ID 的商品")
+            items = valid_items
 
-        existing_prices_statuses = self._bulk_fetch_prices_statuses(items, keyword_id)
-        to_insert_or_update = []
+        keyword_id = await self.get_keyword_id(website, keyword)
+
+        existing_prices_statuses = await self._get_keyword_states(keyword_id)
+        items_to_upsert = []
+        memberships_to_upsert = []
+        history_to_insert = []
+        states_to_cache = []
+        now = int(time.time())
 
         new_num = 0
         price_changed_num = 0
         restocked_num = 0
+        count_deltas = {1: 0, 2: 0, None: 0}
 
         for item in items:
+            existing = existing_prices_statuses.get(item.id)
             price_change = self.process_item(item, existing_prices_statuses)
+            self.update_count_deltas(count_deltas, existing, item.status)
             new_num, price_changed_num, restocked_num = self.update_counts(
                 price_change,
                 new_num,
@@ -184,17 +448,52 @@ class ProductDatabase:
             item.price_change = price_change
 
             valid_price_changes = {3, 4}
-            pre_price = existing_prices_statuses.get(item.id, {}).get("price")
             if price_change in valid_price_changes:
-                item.pre_price = pre_price
+                item.pre_price = int(existing_prices_statuses[item.id][0])
 
             if self.should_yield_item(price_change, push_price_changes):
                 yield item
 
-            to_insert_or_update.append(self.prepare_data_for_insert(item, keyword_id))
+            if self.is_history_event(price_change, existing, item.status):
+                history_to_insert.append(
+                    (now, int(item.price), item.status, website, item.id)
+                )
 
-        self.execute_bulk_upsert(to_insert_or_update)
-        self.update_product_count(keyword_id)
+            row = self.prepare_data_for_insert(item, website)
+            fingerprint = row[-1]
+            # 商品内容的指纹没有变化时不发送到写线程
+            if existing is None or existing[3] != fingerprint:
+                items_to_upsert.append(row)
+            # 只有该关键词看到的价格或状态变化，或者 last_seen_at 过旧时才需要改写关联表
+            last_seen_at = existing[2] if existing else now
+            if (
+                existing is None
+                or existing[:2] != (item.price, item.status)
+                or now - existing[2] >= self.LAST_SEEN_RESOLUTION
+            ):
+                memberships_to_upsert.append(
+                    (keyword_id, item.price, item.status, now, website, item.id)
+                )
+                last_seen_at = now
+            state = (item.price, item.status, last_seen_at, fingerprint)
+            if state != existing:
+                states_to_cache.append((item.id, state))
+
+        write = self.execute_bulk_upsert(
+            items_to_upsert,
+            memberships_to_upsert,
+            keyword_id,
+            count_deltas[1],
+            count_deltas[2],
+            history_to_insert,
+        )
+        self.state_cache.update(keyword_id, states_to_cache)
+        if write is not None:
+            self._discard_state_on_failure(write, keyword_id)
+        if counts is not None:
+            counts["new"] = counts.get("new", 0) + new_num
+            counts["price_changed"] = counts.get("price_changed", 0) + price_changed_num
+            counts["restocked"] = counts.get("restocked", 0) + restocked_num
         if (new_num + price_changed_num + restocked_num) != 0:
             logger.info(
                 f"Database Updated 价格变动:{price_changed_num} 新品：{new_num} 补货：{restocked_num}"
@@ -205,12 +504,12 @@ class ProductDatabase:
         处理单个商品。
 
         :param item: 商品信息。
-        :param existing_prices_statuses: 现有的价格和状态信息。
+        :param existing_prices_statuses: 现有的 id -> (price, status, last_seen_at, fingerprint) 映射。
         :return: 价格变动类型。
         """
-        existing = existing_prices_statuses.get(item.id, {})
-        existing_price = existing.get("price")
-        existing_status = existing.get("status")
+        existing_price, existing_status, _, _ = existing_prices_statuses.get(
+            item.id, (None, None, None, None)
+        )
 
         if existing_price is None or existing_status is None:  # 新品
             return 1
@@ -252,6 +551,34 @@ class ProductDatabase:
 
         return new_num, price_changed_num, restocked_num
 
+    def update_count_deltas(self, count_deltas, existing, status):
+        """
+        根据商品状态的变化累计产品计数的增量。
+
+        :param count_deltas: 计数列 -> 增量 的字典。
+        :param existing: 现有的 (price, status, last_seen_at, fingerprint)，新品为 None。
+        :param status: 商品的新状态。
+        """
+        old_bucket = self.count_bucket(existing[1]) if existing else None
+        new_bucket = self.count_bucket(status)
+        if old_bucket != new_bucket:
+            if existing:
+                count_deltas[old_bucket] -= 1
+            count_deltas[new_bucket] += 1
+
+    def is_history_event(self, price_change, existing, status):
+        """
+        判断商品的变化是否需要写入价格历史：上新、补货、涨价、降价，以及在售变为售出。
+
+        :param price_change: 价格变动类型。
+        :param existing: 现有的 (price, status, last_seen_at, fingerprint)，新品为 None。
+        :param status: 商品的新状态。
+        :return: 是否写入价格历史。
+        """
+        if price_change != 0:
+            return True
+        return existing is not None and existing[1] != 0 and status == 0
+
     def should_yield_item(self, price_change, push_price_changes):
         """
         决定是否yield商品。
@@ -262,75 +589,286 @@ class ProductDatabase:
         """
         return (push_price_changes and price_change != 0) or (0 < price_change < 3)
 
-    def prepare_data_for_insert(self, item, keyword_id):
+    @staticmethod
+    def item_fingerprint(content: tuple) -> int:
+        """
+        计算商品内容的 64 位指纹，用于判断商品自上次写入后是否发生变化。
+
+        :param content: (price, name, image_url, product_url, status) 元组。
+        :return: 有符号 64 位整数，可以直接保存在 SQLite 的 INTEGER 列中。
+        """
+        digest = hashlib.blake2b(repr(content).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    def prepare_data_for_insert(self, item, website):
         """
-        准备用于插入的数据。
+        准备用于插入 items 表的数据。能由商品 ID 推导出的 URL 保存为 NULL，最后一列为商品内容的指纹。
 
         :param item: 商品信息。
-        :param keyword_id: 关键词ID。
+        :param website: 关联的网站。
         :return: 准备插入的数据。
         """
-        return (
-            item.id,
-            keyword_id,
+        codec = get_url_codec(website)
+        content = (
             item.price,
             item.name,
-            item.image_url,
-            item.product_url,
+            codec.encode("image_url", item.id, item.image_url),
+            codec.encode("product_url", item.id, item.product_url),
             item.status,
         )
+        return (website, item.id, *content, self.item_fingerprint(content))
 
-    def execute_bulk_upsert(self, to_insert_or_update):
+    def execute_bulk_upsert(
+        self,
+        items_to_upsert,
+        memberships_to_upsert=(),
+        keyword_id=None,
+        count_1_delta=0,
+        count_2_delta=0,
+        history_to_insert=(),
+    ):
         """
-        执行批量插入或更新。
+        执行批量插入或更新（write-behind），写线程会把多个关键词的批次合并到同一个事务中。
+        关键词关联、产品计数的增量和价格历史与该批次在同一个事务中写入。
 
-        :param to_insert_or_update: 待插入或更新的数据列表。
+        :param items_to_upsert: 新增或指纹发生变化的商品数据列表。
+        :param memberships_to_upsert: 价格或状态发生变化的关键词关联数据列表。
+        :param keyword_id: 关键词 ID。
+        :param count_1_delta: product_count_1 的增量。
+        :param count_2_delta: product_count_2 的增量。
+        :param history_to_insert: 需要写入价格历史的 (时间, 价格, 状态, 网站, 商品 ID) 列表。
+        :return: 写任务的 Future，没有需要写入的数据时返回 None。
         """
-        if to_insert_or_update:
-            with self.conn:
-                self.conn.executemany(
-                    self.SQL_STATEMENTS["upsert_product"], to_insert_or_update
+        if not (items_to_upsert or memberships_to_upsert or count_1_delta or count_2_delta):
+            return None
+
+        def upsert(conn):
+            if history_to_insert:
+                conn.executemany(
+                    self.SQL_STATEMENTS["insert_changed_price_history"],
+                    [(*row, row[1], row[2]) for row in history_to_insert],
+                )
+            conn.executemany(self.SQL_STATEMENTS["upsert_item"], items_to_upsert)
+            if history_to_insert:
+                conn.executemany(
+                    self.SQL_STATEMENTS["insert_first_price_history"], history_to_insert
+                )
+            if memberships_to_upsert:
+                conn.executemany(
+                    self.SQL_STATEMENTS["upsert_keyword_item"], memberships_to_upsert
+                )
+            if count_1_delta or count_2_delta:
+                conn.execute(
+                    self.SQL_STATEMENTS["increment_product_count"],
+                    (count_1_delta, count_2_delta, keyword_id),
                 )
 
-    def _bulk_fetch_prices_statuses(self, items, keyword_id) -> dict:
+        return self.engine.write(upsert)
+
+    def _discard_state_on_failure(self, write: Future, keyword_id: int):
         """
-        批量获取产品的当前价格和状态。
+        写任务失败时丢弃关键词的状态缓存。缓存在提交写入时已经更新，失败后必须从 SQLite 重新加载，
+        否则未写入的商品在之后的轮次中会被当作没有变化而不再写入。
 
-        :param items: 包含产品信息的字典列表。
-        :param keyword_id: 关联的关键词 ID。
-        :return: 一个字典，包含产品 ID 和对应的价格及状态。
+        :param write: execute_bulk_upsert 返回的 Future。
+        :param keyword_id: 关键词 ID。
         """
+        loop = asyncio.get_running_loop()
+
+        def on_done(future: Future):
+            if future.cancelled() or future.exception() is None:
+                return
+            # 回调在写线程中执行，缓存只在事件循环线程中修改
+            try:
+                loop.call_soon_threadsafe(self.state_cache.discard, keyword_id)
+            except RuntimeError:
+                pass  # 事件循环已关闭
 
-        prices_statuses = {}
+        write.add_done_callback(on_done)
 
-        # 创建临时表
-        self.conn.execute(
-            "CREATE TEMPORARY TABLE temp_ids (id TEXT, keyword_id INTEGER)"
+    async def get_item(self, website: str, id: str) -> Optional[dict]:
+        """
+        获取单个商品保存的信息，URL 会根据站点的编解码器还原为完整地址。
+
+        :param website: 网站名。
+        :param id: 商品 ID。
+        :return: 商品信息字典，不存在时返回 None。
+        """
+        row = await self.engine.run(
+            lambda conn: self._safe_execute(conn, "select_item", (website, id), fetch_one=True)
         )
+        if not row:
+            return None
+        name, price, image_url, product_url, status = row
+        codec = get_url_codec(website)
+        return {
+            "id": id,
+            "name": name,
+            "price": price,
+            "image_url": codec.decode("image_url", id, image_url),
+            "product_url": codec.decode("product_url", id, product_url),
+            "status": status,
+        }
+
+    async def get_lowest_price(self, website: str, id: str, days: int = 90) -> Optional[int]:
+        """
+        查询商品在最近若干天内在售时的最低价格。在只读连接上查询，不等待积压的写入，
+        因此结果可能不包含本轮刚检测到的价格，调用方需要与当前价格比较。
 
-        # 插入数据到临时表
-        self.conn.executemany(
-            "INSERT INTO temp_ids (id, keyword_id) VALUES (?, ?)",
-            [(item.id, keyword_id) for item in items],
+        :param website: 网站名。
+        :param id: 商品 ID。
+        :param days: 查询的天数。
+        :return: 最低价格，没有历史记录时返回 None。
+        """
+        since = int(time.time()) - days * 86400
+        row = await self.engine.read(
+            lambda conn: self._safe_execute(
+                conn, "select_lowest_price", (website, id, since), fetch_one=True
+            )
         )
+        return row[0] if row else None
+
+    async def compact_price_history(self, retention_days: Dict[str, int]):
+        """
+        压缩价格历史：早于 HISTORY_DOWNSAMPLE_AFTER_DAYS 天的记录降采样为每天一条，
+        并删除各网站超过保留期限的记录。
+
+        :param retention_days: 网站名 -> 保留天数，0 表示永久保留。
+        """
+        now = int(time.time())
+        downsample_before = now - self.HISTORY_DOWNSAMPLE_AFTER_DAYS * 86400
+
+        def compact(conn):
+            removed = 0
+            for website, days in retention_days.items():
+                if days <= 0:
+                    continue
+                cursor = self._safe_execute(
+                    conn, "expire_price_history", (now - days * 86400, website)
+                )
+                removed += cursor.rowcount if cursor else 0
+            cursor = self._safe_execute(
+                conn, "downsample_price_history", (downsample_before, downsample_before)
+            )
+            return removed + (cursor.rowcount if cursor else 0)
 
-        # 执行查询
-        query = """
-        SELECT p.id, p.price, p.status FROM products p
-        INNER JOIN temp_ids t ON p.id = t.id AND p.keyword_id = t.keyword_id
+        removed = await self.engine.run(compact)
+        logger.info(f"Price history compacted: {removed} points removed from {self.db_name}")
+
+    async def prune_stale_products(self, prune_after_days: Dict[str, int]):
+        """
+        清理各网站下长期未在关键词搜索结果中出现的商品，以及不再属于任何关键词的商品和价格历史。
+
+        :param prune_after_days: 网站名 -> 未出现多少天后清理，0 表示不清理。
+        """
+        now = int(time.time())
+
+        def prune(conn):
+            keyword_ids, removed = set(), 0
+            for website, days in prune_after_days.items():
+                if days <= 0:
+                    continue
+                before = now - days * 86400
+                rows = self._safe_execute(
+                    conn, "select_stale_keyword_ids", (before, website), fetch_all=True
+                )
+                if not rows:
+                    continue
+                keyword_ids.update(row[0] for row in rows)
+                self._safe_execute(
+                    conn, "discount_stale_product_counts", (before, before, website)
+                )
+                cursor = self._safe_execute(
+                    conn, "delete_stale_keyword_items", (before, website)
+                )
+                removed += cursor.rowcount if cursor else 0
+            if removed:
+                self._safe_execute(conn, "delete_orphan_price_history")
+                self._safe_execute(conn, "delete_orphan_items")
+            return keyword_ids, removed
+
+        keyword_ids, removed = await self.engine.run(prune)
+        # 被清理的关键词下次使用时从数据库重新加载状态
+        for keyword_id in keyword_ids:
+            self.state_cache.discard(keyword_id)
+        if removed:
+            logger.info(f"Pruned {removed} stale keyword items from {self.db_name}")
+
+    async def incremental_vacuum(self, max_steps: int = 64):
+        """
+        分批回收数据库的空闲页。每批只回收 INCREMENTAL_VACUUM_PAGES 页，批次之间让出写线程，
+        因此不会长时间阻塞监控的写入。
+
+        :param max_steps: 本次最多执行的批次数。
         """
-        cursor = self.conn.execute(query)
-        for id, price, status in cursor.fetchall():
-            prices_statuses[id] = {"price": price, "status": status}
+        pages = self.INCREMENTAL_VACUUM_PAGES
 
-        # 删除临时表
-        self.conn.execute("DROP TABLE temp_ids")
+        def vacuum_step(conn):
+            # execute() 每次只回收一页，executescript() 才会把语句执行完
+            conn.executescript(f"PRAGMA incremental_vacuum({pages});")
+            return conn.execute("PRAGMA freelist_count;").fetchone()[0]
 
-        return prices_statuses
+        for _ in range(max_steps):
+            free_pages = await self.engine.run(vacuum_step)
+            if not free_pages:
+                break
+            await asyncio.sleep(0)
+
+    async def _get_keyword_states(self, keyword_id) -> dict:
+        """
+        获取关键词下所有产品的当前价格和状态。优先从状态缓存读取，未命中时从数据库加载并放入缓存。
+
+        :param keyword_id: 关联的关键词 ID。
+        :return: 一个字典，包含产品 ID 和对应的 (price, status, last_seen_at, fingerprint)。
+        """
+        states = self.state_cache.get(keyword_id)
+        if states is None:
+            rows = await self.engine.run(
+                lambda conn: self._safe_execute(
+                    conn, "select_keyword_states", (keyword_id,), fetch_all=True
+                )
+            )
+            states = {
+                id: (price, status, last_seen_at, fingerprint)
+                for id, price, status, last_seen_at, fingerprint in rows or []
+            }
+            self.state_cache.put(keyword_id, states)
+        return states
+
+    async def _warm_state_cache(self):
+        """启动时从数据库预热状态缓存，直到达到缓存的条目上限。"""
+        max_entries = self.state_cache.max_entries
+
+        def load_states(conn):
+            cursor = self._safe_execute(conn, "select_all_states")
+            if cursor is None:
+                return []
+
+            loaded, total = [], 0
+            current_id, states = None, {}
+            for keyword_id, id, price, status, last_seen_at, fingerprint in cursor:
+                if keyword_id != current_id:
+                    if current_id is not None:
+                        loaded.append((current_id, states))
+                        total += len(states)
+                    if total >= max_entries:
+                        current_id = None
+                        break
+                    current_id, states = keyword_id, {}
+                states[id] = (price, status, last_seen_at, fingerprint)
+            if current_id is not None:
+                loaded.append((current_id, states))
+            return loaded
+
+        for keyword_id, states in await self.engine.run(load_states):
+            self.state_cache.put(keyword_id, states)
+        logger.info(
+            f"State cache warmed: {len(self.state_cache)} items from {self.db_name}"
+        )
 
     def close(self):
         """
-        显式关闭数据库连接。
+        刷新尚未写入的数据并释放存储引擎。
         """
-        self.conn.close()
+        self.engine.release()
         logger.info(f"Database connection closed: {self.db_name}")
@@ -0,0 +1,243 @@
+import sqlite3
+from typing import Callable, List, NamedTuple, Tuple
+
+from loguru import logger
+
+from ..utils.url_codec import URL_CODECS
+
+
+class Migration(NamedTuple):
+    version: int  # 迁移完成后的 schema 版本号
+    description: str  # 迁移说明
+    apply: Callable[[sqlite3.Connection], None]  # 执行迁移的函数
+    transactional: bool = True  # 是否在事务中执行（VACUUM 等语句不能在事务中执行）
+
+
+def _create_base_tables(conn: sqlite3.Connection):
+    # 初始的表结构，旧版本创建的数据库已经包含这两张表，IF NOT EXISTS 保证可重复执行
+    conn.execute(
+        """
+        -- 创建一个用于存储网站关键词的表
+        CREATE TABLE IF NOT EXISTS website_keywords (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,  -- 主键，自动递增
+            website TEXT NOT NULL,                 -- 网站名
+            keyword TEXT NOT NULL,                 -- 关键词
+            product_count_1 INTEGER DEFAULT 0,     -- 统计 status 为 1, 2, 3 的商品数量
+            product_count_2 INTEGER DEFAULT 0,     -- 统计 status 为 0 的商品数量
+            UNIQUE(website, keyword)               -- 确保每个网站和关键词的组合是唯一的
+        );
+        """
+    )
+    conn.execute(
+        """
+        -- 创建一个用于存储产品信息的表
+        CREATE TABLE IF NOT EXISTS products (
+            id TEXT NOT NULL,                      -- 产品 ID
+            keyword_id INTEGER NOT NULL,           -- 关联的关键词 ID
+            name TEXT,                             -- 产品名
+            price REAL NOT NULL,                   -- 价格
+            image_url TEXT,                        -- 图片 URL
+            product_url TEXT,                      -- 产品 URL
+            status INTEGER,                        -- 产品状态
+            PRIMARY KEY (id, keyword_id),          -- 将产品 ID 和关键词 ID 一起作为主键，同时用于按 ID 跨关键词查找
+            FOREIGN KEY (keyword_id) REFERENCES website_keywords (id) -- 外键关联到 website_keywords 表
+        );
+        """
+    )
+
+
+def _add_keyword_status_index(conn: sqlite3.Connection):
+    # 覆盖索引：按关键词加载状态缓存（keyword_id 范围扫描 + id/price/status）
+    # 以及按状态统计商品数量（keyword_id, status 前缀）都只需读索引
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_products_keyword_status
+        ON products (keyword_id, status, id, price);
+        """
+    )
+
+
+def _normalize_products(conn: sqlite3.Connection):
+    # 商品信息按 (website, id) 只保存一份；关键词与商品的关系放在窄表 keyword_items 中，
+    # 其中的 price/status 是该关键词最近一次看到的状态，用于按关键词比对价格和状态变化
+    conn.execute(
+        """
+        CREATE TABLE items (
+            item_id INTEGER PRIMARY KEY,           -- 商品的内部 ID
+            website TEXT NOT NULL,                 -- 网站名
+            id TEXT NOT NULL,                      -- 网站上的产品 ID
+            name TEXT,                             -- 产品名
+            price REAL NOT NULL,                   -- 最新价格
+            image_url TEXT,                        -- 图片 URL
+            product_url TEXT,                      -- 产品 URL
+            status INTEGER,                        -- 最新状态
+            UNIQUE (website, id)                   -- 同一网站的同一商品只保存一份
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE keyword_items (
+            keyword_id INTEGER NOT NULL,           -- 关联的关键词 ID
+            item_id INTEGER NOT NULL,              -- 关联的商品内部 ID
+            price REAL NOT NULL,                   -- 该关键词最近一次看到的价格
+            status INTEGER,                        -- 该关键词最近一次看到的状态
+            PRIMARY KEY (keyword_id, item_id),
+            FOREIGN KEY (keyword_id) REFERENCES website_keywords (id),
+            FOREIGN KEY (item_id) REFERENCES items (item_id)
+        ) WITHOUT ROWID;
+        """
+    )
+    # 按商品查找其所属的关键词
+    conn.execute("CREATE INDEX idx_keyword_items_item ON keyword_items (item_id);")
+
+    conn.execute(
+        """
+        INSERT INTO items (website, id, name, price, image_url, product_url, status)
+        SELECT k.website, p.id, p.name, p.price, p.image_url, p.product_url, p.status
+        FROM products p JOIN website_keywords k ON k.id = p.keyword_id
+        WHERE true
+        ON CONFLICT (website, id) DO NOTHING;
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO keyword_items (keyword_id, item_id, price, status)
+        SELECT p.keyword_id, i.item_id, p.price, p.status
+        FROM products p
+        JOIN website_keywords k ON k.id = p.keyword_id
+        JOIN items i ON i.website = k.website AND i.id = p.id;
+        """
+    )
+    conn.execute("DROP TABLE products;")
+
+
+def _compact_derived_urls(conn: sqlite3.Connection):
+    # URL 能由商品 ID 推导出的站点只保存 NULL，读取时再由 URL_CODECS 重建
+    for website, codec in URL_CODECS.items():
+        rows = conn.execute(
+            "SELECT item_id, id, image_url, product_url FROM items WHERE website = ?;",
+            (website,),
+        ).fetchall()
+        updates = []
+        for item_id, id, image_url, product_url in rows:
+            encoded = (
+                codec.encode("image_url", id, image_url),
+                codec.encode("product_url", id, product_url),
+            )
+            if encoded != (image_url, product_url):
+                updates.append((*encoded, item_id))
+        conn.executemany(
+            "UPDATE items SET image_url = ?, product_url = ? WHERE item_id = ?;",
+            updates,
+        )
+
+
+def _add_price_history(conn: sqlite3.Connection):
+    # 只追加的价格与状态历史，仅在检测到上新、补货、涨价、降价、售出时写入
+    # 主键 (item_id, recorded_at) 同时是按商品和时间范围查询的索引
+    conn.execute(
+        """
+        CREATE TABLE price_history (
+            item_id INTEGER NOT NULL,              -- 关联的商品内部 ID
+            recorded_at INTEGER NOT NULL,          -- 记录时间（Unix 时间戳，秒）
+            price INTEGER NOT NULL,                -- 价格（日元）
+            status INTEGER,                        -- 商品状态
+            PRIMARY KEY (item_id, recorded_at),
+            FOREIGN KEY (item_id) REFERENCES items (item_id)
+        ) WITHOUT ROWID;
+        """
+    )
+
+
+def _add_last_seen_at(conn: sqlite3.Connection):
+    # 关键词最近一次在搜索结果中看到该商品的时间，用于清理长期未出现的商品
+    conn.execute("ALTER TABLE keyword_items ADD COLUMN last_seen_at INTEGER NOT NULL DEFAULT 0;")
+    conn.execute("UPDATE keyword_items SET last_seen_at = CAST(strftime('%s', 'now') AS INTEGER);")
+    conn.execute(
+        "CREATE INDEX idx_keyword_items_last_seen ON keyword_items (last_seen_at);"
+    )
+
+
+def _enable_incremental_vacuum(conn: sqlite3.Connection):
+    # auto_vacuum 模式只有在 VACUUM 之后才会对已有数据库生效，之后由维护任务分批回收空闲页
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    conn.execute("VACUUM;")
+
+
+def _add_item_fingerprint(conn: sqlite3.Connection):
+    # 商品内容的 64 位指纹，内容未变化的商品不再发送到写线程；旧数据为 NULL，第一次看到时写入
+    conn.execute("ALTER TABLE items ADD COLUMN fingerprint INTEGER;")
+
+
+def _add_keyword_event_rate(conn: sqlite3.Connection):
+    # 关键词变化事件（上新、补货、价格变动）频率的 EWMA，自适应监控间隔在重启后从这里恢复
+    conn.execute("ALTER TABLE website_keywords ADD COLUMN event_rate REAL;")
+
+
+def _add_keyword_crawl_state(conn: sqlite3.Connection):
+    # 关键词已完成首轮抓取时的搜索条件哈希和最近一次完成抓取的时间，重启后条件未变化的关键词跳过首轮全量抓取
+    conn.execute("ALTER TABLE website_keywords ADD COLUMN baseline_hash INTEGER;")
+    conn.execute("ALTER TABLE website_keywords ADD COLUMN last_crawled_at INTEGER;")
+
+
+# 按版本号顺序排列的迁移列表，新的迁移只能追加在末尾
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create website_keywords and products tables", _create_base_tables),
+    Migration(2, "add covering index on products(keyword_id, status)", _add_keyword_status_index),
+    Migration(3, "split products into items and keyword_items", _normalize_products),
+    Migration(4, "store derivable product/image URLs as NULL", _compact_derived_urls),
+    Migration(5, "add price_history table", _add_price_history),
+    Migration(6, "add keyword_items.last_seen_at", _add_last_seen_at),
+    Migration(7, "enable incremental auto_vacuum", _enable_incremental_vacuum, transactional=False),
+    Migration(8, "add items.fingerprint", _add_item_fingerprint),
+    Migration(9, "add website_keywords.event_rate", _add_keyword_event_rate),
+    Migration(10, "add website_keywords crawl state", _add_keyword_crawl_state),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    获取数据库当前的 schema 版本号，保存在 PRAGMA user_version 中。
+
+    :param conn: 数据库连接。
+    :return: schema 版本号，旧版本创建的数据库为 0。
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """
+    将数据库原地升级到最新的 schema 版本。每个迁移执行成功后立即记录版本号，失败时回滚该迁移并抛出异常。
+
+    :param conn: 数据库连接。
+    :return: (升级前的版本号, 升级后的版本号)。
+    """
+    current = get_schema_version(conn)
+    if current > LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema version {current} is newer than supported version {LATEST_VERSION}"
+        )
+
+    start = current
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        logger.info(f"Applying database migration {migration.version}: {migration.description}")
+        if migration.transactional:
+            conn.execute("BEGIN")
+            try:
+                migration.apply(conn)
+                conn.execute(f"PRAGMA user_version = {migration.version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        else:
+            migration.apply(conn)
+            conn.execute(f"PRAGMA user_version = {migration.version}")
+        current = migration.version
+
+    return start, current
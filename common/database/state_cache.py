@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+# 单个商品的缓存状态: (price, status, last_seen_at, fingerprint)
+ProductState = Tuple[float, Optional[int], int, Optional[int]]
+
+
+class KeywordStateCache:
+    """
+    按关键词 ID 常驻内存的商品状态缓存。
+
+    每个关键词对应一个 id -> (price, status, last_seen_at, fingerprint) 的映射，用于在 upsert 时直接在内存中比对，
+    避免每轮都回查 SQLite。缓存以商品条目数为上限，超出时按最近最少使用的顺序整体淘汰关键词。
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        :param max_entries: 缓存允许保存的商品条目总数上限。
+        """
+        self.max_entries = max_entries
+        self._keywords: "OrderedDict[int, Dict[str, ProductState]]" = OrderedDict()
+        self._size = 0
+
+    def __contains__(self, keyword_id: int) -> bool:
+        return keyword_id in self._keywords
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get(self, keyword_id: int) -> Optional[Dict[str, ProductState]]:
+        """
+        获取关键词的状态映射，并将其标记为最近使用。
+
+        :param keyword_id: 关键词 ID。
+        :return: 状态映射，如果该关键词未被缓存则返回 None。
+        """
+        states = self._keywords.get(keyword_id)
+        if states is not None:
+            self._keywords.move_to_end(keyword_id)
+        return states
+
+    def put(self, keyword_id: int, states: Dict[str, ProductState]):
+        """
+        用完整的状态映射替换关键词的缓存。
+
+        :param keyword_id: 关键词 ID。
+        :param states: id -> (price, status, last_seen_at, fingerprint) 映射。
+        """
+        old = self._keywords.pop(keyword_id, None)
+        if old is not None:
+            self._size -= len(old)
+        self._keywords[keyword_id] = states
+        self._size += len(states)
+        self._evict(keep=keyword_id)
+
+    def update(self, keyword_id: int, rows: Iterable[Tuple[str, ProductState]]):
+        """
+        将写入数据库的行同步到缓存中。未缓存的关键词会被忽略，下次访问时再从数据库加载。
+
+        :param keyword_id: 关键词 ID。
+        :param rows: (id, (price, status, last_seen_at, fingerprint)) 元组序列。
+        """
+        states = self._keywords.get(keyword_id)
+        if states is None:
+            return
+        before = len(states)
+        for product_id, state in rows:
+            states[product_id] = state
+        self._size += len(states) - before
+        self._evict(keep=keyword_id)
+
+    def discard(self, keyword_id: int):
+        """移除关键词的缓存。"""
+        states = self._keywords.pop(keyword_id, None)
+        if states is not None:
+            self._size -= len(states)
+
+    def _evict(self, keep: int):
+        """按 LRU 顺序整体淘汰冷关键词，直到总条目数不超过上限。正在使用的关键词不会被淘汰。"""
+        while self._size > self.max_entries and len(self._keywords) > 1:
+            keyword_id = next(iter(self._keywords))
+            if keyword_id == keep:
+                self._keywords.move_to_end(keyword_id)
+                keyword_id = next(iter(self._keywords))
+            states = self._keywords.pop(keyword_id)
+            self._size -= len(states)
+            logger.debug(f"State cache evicted keyword {keyword_id} ({len(states)} items)")
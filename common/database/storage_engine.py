@@ -0,0 +1,225 @@
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+# 写线程中执行的函数，接收该线程独占的 sqlite3 连接
+ConnectionFunc = Callable[[sqlite3.Connection], Any]
+
+
+class _Job:
+    __slots__ = ("func", "future", "is_write")
+
+    def __init__(self, func: ConnectionFunc, is_write: bool):
+        self.func = func
+        self.future: Future = Future()
+        self.is_write = is_write
+
+
+class StorageEngine:
+    """
+    每个数据库文件对应一个专用写线程的存储引擎。
+
+    所有 SQL 都在写线程中执行，asyncio 事件循环只负责把任务放入队列：
+    - 写任务（write/submit）是 write-behind 的，队列中连续的写任务会被合并到同一个 WAL 事务中提交；
+    - 读任务（call/run）按入队顺序执行，因此总能读到之前提交的写入，结果可以 await；
+    - 只读查询（read）在独立的只读连接上执行，不排在积压的写任务之后，但看不到尚未提交的写入。
+    """
+
+    # 单个事务最多合并的写任务数
+    MAX_BATCH_JOBS = 256
+
+    _engines: Dict[str, "StorageEngine"] = {}
+    _engines_lock = threading.Lock()
+
+    def __init__(self, db_name: str):
+        """
+        :param db_name: 数据库的文件名。
+        """
+        self.db_name = db_name
+        self._refs = 0
+        self._queue: "queue.SimpleQueue[Optional[_Job]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"sqlite-writer:{os.path.basename(db_name)}",
+            daemon=True,
+        )
+        self._thread.start()
+        # 只读连接只在读线程中创建和使用
+        self._reader = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"sqlite-reader:{os.path.basename(db_name)}"
+        )
+        self._read_conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def acquire(cls, db_name: str) -> "StorageEngine":
+        """
+        获取数据库文件对应的存储引擎，同一文件在进程内只会有一个写线程。
+
+        :param db_name: 数据库的文件名。
+        :return: 共享的 StorageEngine 实例。
+        """
+        key = os.path.abspath(db_name)
+        with cls._engines_lock:
+            engine = cls._engines.get(key)
+            if engine is None:
+                engine = cls._engines[key] = cls(db_name)
+            engine._refs += 1
+            return engine
+
+    def release(self):
+        """释放一次引用，最后一个引用释放时刷新队列并关闭写线程。"""
+        with self._engines_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+            self._engines.pop(os.path.abspath(self.db_name), None)
+        self.close()
+
+    def write(self, func: ConnectionFunc) -> Future:
+        """
+        提交一个写任务，它会与相邻的写任务合并在同一个事务中执行。
+
+        :param func: 在写线程中执行的函数。
+        :return: 任务的 Future，调用方可以不等待（write-behind）。
+        """
+        return self._put(_Job(func, is_write=True))
+
+    def submit(self, statement: str, rows: List[tuple]) -> Future:
+        """
+        提交一批 executemany 写入。
+
+        :param statement: SQL 语句。
+        :param rows: 参数列表。
+        :return: 任务的 Future。
+        """
+        return self.write(lambda conn: conn.executemany(statement, rows))
+
+    def call(self, func: ConnectionFunc) -> Future:
+        """
+        提交一个读任务（或需要立即拿到结果的任务），在写线程中单独执行。
+
+        :param func: 在写线程中执行的函数。
+        :return: 任务的 Future。
+        """
+        return self._put(_Job(func, is_write=False))
+
+    async def run(self, func: ConnectionFunc) -> Any:
+        """
+        在写线程中执行函数并等待其结果，不阻塞事件循环。
+
+        :param func: 在写线程中执行的函数。
+        :return: 函数的返回值。
+        """
+        return await asyncio.wrap_future(self.call(func))
+
+    async def read(self, func: ConnectionFunc) -> Any:
+        """
+        在独立的只读连接上执行查询并等待其结果。WAL 模式下读写互不阻塞，
+        适合对实时性要求高、可以接受看不到尚未提交写入的查询。
+
+        :param func: 在读线程中执行的函数，接收只读连接。
+        :return: 函数的返回值。
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._reader, self._execute_read, func
+        )
+
+    def _execute_read(self, func: ConnectionFunc) -> Any:
+        if self._read_conn is None:
+            self._read_conn = sqlite3.connect(self.db_name)
+            self._read_conn.execute("PRAGMA query_only = ON")
+        return func(self._read_conn)
+
+    def _close_reader(self):
+        if self._read_conn is not None:
+            self._read_conn.close()
+            self._read_conn = None
+
+    def flush(self):
+        """阻塞等待队列中所有已提交的任务执行完毕。"""
+        self.call(lambda conn: None).result()
+
+    def close(self):
+        """刷新队列中剩余的任务并停止写线程和读线程。"""
+        self._reader.submit(self._close_reader)
+        self._reader.shutdown(wait=True)
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _put(self, job: _Job) -> Future:
+        if not self._thread.is_alive():
+            job.future.set_exception(RuntimeError(f"Storage engine closed: {self.db_name}"))
+        else:
+            self._queue.put(job)
+        return job.future
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        pending: Optional[_Job] = None
+        while True:
+            job = pending if pending is not None else self._queue.get()
+            pending = None
+            if job is None:
+                break
+
+            if not job.is_write:
+                self._execute_one(conn, job)
+                continue
+
+            # 合并队列中连续的写任务，遇到读任务或关闭信号时停止合并
+            batch = [job]
+            while len(batch) < self.MAX_BATCH_JOBS:
+                try:
+                    next_job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if next_job is None or not next_job.is_write:
+                    pending = next_job
+                    break
+                batch.append(next_job)
+
+            self._execute_batch(conn, batch)
+
+        conn.close()
+        logger.info(f"Storage engine stopped: {self.db_name}")
+
+    def _execute_one(self, conn: sqlite3.Connection, job: _Job):
+        try:
+            with conn:
+                result = job.func(conn)
+        except Exception as e:
+            if job.is_write:
+                logger.error(f"Database error: {e}")
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+
+    def _execute_batch(self, conn: sqlite3.Connection, batch: List[_Job]):
+        results = []
+        try:
+            with conn:
+                for job in batch:
+                    results.append(job.func(conn))
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Database error: {e}")
+                batch[0].future.set_exception(e)
+                return
+            # 合并事务失败时逐个重试，避免一个错误的批次拖累其他关键词的写入
+            logger.warning(f"Coalesced write of {len(batch)} batches failed, retrying one by one: {e}")
+            for job in batch:
+                self._execute_one(conn, job)
+            return
+
+        for job, result in zip(batch, results):
+            job.future.set_result(result)
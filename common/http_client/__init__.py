@@ -1,2 +1,3 @@
 from .async_httpx_client import AsyncHTTPXClient
 from .async_aiohttp_client import AsyncAIOHTTPClient
+from .governor import HostGovernor
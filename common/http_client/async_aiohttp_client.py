@@ -9,6 +9,8 @@ from tenacity import (
     retry_if_exception_type)
 from loguru import logger
 
+from .governor import HostGovernor
+
 
 # 通用响应类，用于封装 aiohttp 和 httpx 的响应对象
 class AsyncResponse:
@@ -83,8 +85,11 @@ class AsyncAIOHTTPClient:
         proxy: Optional[str] = None,
         redirects=True,
         ssl_verify: bool = False,
+        governor: Optional[HostGovernor] = None,
     ):
         self._timeout = ClientTimeout(total=timeout)
+        # 按主机共享的请求速率和并发限制
+        self.governor = governor or HostGovernor()
         self._ssl_verify = ssl_verify
         self._proxy = proxy
         self._client: Optional[aiohttp.ClientSession] = None
@@ -106,7 +111,9 @@ class AsyncAIOHTTPClient:
         client = await self._get_client()
         if self._proxy:
             kwargs["proxy"] = self._proxy
-        response = await client.request(method, url, ssl = False, **kwargs)
+        async with self.governor.slot(url) as limiter:
+            response = await client.request(method, url, ssl = False, **kwargs)
+            limiter.observe(response.status, response.headers.get("Retry-After"))
         return AsyncResponse(response)
 
     @retry(**RETRY_ARGUMENTS)
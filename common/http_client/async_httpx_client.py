@@ -1,4 +1,5 @@
 import httpx
+from typing import Optional
 from loguru import logger
 from tenacity import (
     retry,
@@ -6,6 +7,8 @@ from tenacity import (
     stop_after_attempt,
     retry_if_exception_type)
 
+from .governor import HostGovernor
+
 
 # 自定义重试前的回调函数
 def custom_before_sleep_log(retry_state):
@@ -69,7 +72,8 @@ class AsyncHTTPXClient:
         proxy=None,
         redirects=True,
         ssl_verify=False,
-    ):        
+        governor: Optional[HostGovernor] = None,
+    ):
         self._client_kwargs = {
             "http2": http2,
             "timeout": timeout,
@@ -78,6 +82,8 @@ class AsyncHTTPXClient:
             "verify": ssl_verify,
         }
         self._client = None
+        # 按主机共享的请求速率和并发限制
+        self.governor = governor or HostGovernor()
 
     async def _get_client(self):
         if self._client is None:
@@ -98,7 +104,9 @@ class AsyncHTTPXClient:
 
     async def _request(self, method, url, **kwargs) -> AsyncHTTPResponse:
         client = await self._get_client()
-        response = await client.request(method, url, **kwargs)
+        async with self.governor.slot(str(url)) as limiter:
+            response = await client.request(method, url, **kwargs)
+            limiter.observe(response.status_code, response.headers.get("Retry-After"))
         return AsyncHTTPResponse(response)
 
     @retry(**RETRY_ARGUMENTS)
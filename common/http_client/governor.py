@@ -0,0 +1,173 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+
+class HostLimiter:
+    """
+    单个主机的请求限制：令牌桶限制请求速率，计数器限制同时进行的请求数。
+
+    收到 429/503 时速率减半（并遵守 Retry-After），之后每个成功的请求线性恢复一点速率，
+    直到回到配置的速率（AIMD）。
+    """
+
+    # 限流后速率最低降到配置值的比例
+    MIN_RATE_FACTOR = 0.05
+    # 每个成功请求恢复的速率占配置值的比例
+    RECOVERY_FACTOR = 0.02
+    # 没有 Retry-After 时，被限流后暂停的秒数
+    DEFAULT_PAUSE = 5.0
+
+    def __init__(self, host: str, rate: float = 0, max_inflight: int = 0):
+        """
+        :param host: 主机名。
+        :param rate: 每秒允许的请求数，0 表示不限制。
+        :param max_inflight: 同时进行的请求数上限，0 表示不限制。
+        """
+        self.host = host
+        self.rate = rate
+        self.max_inflight = max_inflight
+        self.current_rate = rate
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._inflight = 0
+        self._rate_lock = asyncio.Lock()  # 按到达顺序排队等待令牌
+        self._released = asyncio.Condition()
+
+    def configure(self, rate: Optional[float] = None, max_inflight: Optional[int] = None):
+        """
+        收紧限制。多个用户为同一主机配置了不同的值时，取最严格的那个。
+
+        :param rate: 每秒允许的请求数，0 或 None 表示不修改。
+        :param max_inflight: 同时进行的请求数上限，0 或 None 表示不修改。
+        """
+        if rate and (not self.rate or rate < self.rate):
+            self.rate = self.current_rate = rate
+        if max_inflight and (not self.max_inflight or max_inflight < self.max_inflight):
+            self.max_inflight = max_inflight
+
+    async def acquire(self):
+        """等待一个并发名额和一个令牌。"""
+        if self.max_inflight:
+            async with self._released:
+                await self._released.wait_for(lambda: self._inflight < self.max_inflight)
+                self._inflight += 1
+        else:
+            self._inflight += 1
+
+        try:
+            if self.rate or self._paused_until:
+                async with self._rate_lock:
+                    await self._wait_for_token()
+        except BaseException:
+            await self.release()
+            raise
+
+    async def release(self):
+        """归还并发名额。"""
+        self._inflight -= 1
+        if self.max_inflight:
+            async with self._released:
+                self._released.notify()
+
+    async def _wait_for_token(self):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if not self.current_rate:
+                return
+            self._tokens = min(
+                1.0, self._tokens + (now - self._updated) * self.current_rate
+            )
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / self.current_rate)
+
+    def observe(self, status_code: int, retry_after: Optional[str] = None):
+        """
+        根据响应状态码调整速率。
+
+        :param status_code: HTTP 状态码。
+        :param retry_after: 响应头中的 Retry-After。
+        """
+        if status_code in (429, 503):
+            pause = self.DEFAULT_PAUSE
+            if retry_after and retry_after.strip().isdigit():
+                pause = float(retry_after.strip())
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            if self.rate:
+                self.current_rate = max(
+                    self.current_rate / 2, self.rate * self.MIN_RATE_FACTOR
+                )
+            logger.warning(
+                f"{self.host} 返回 {status_code}，暂停 {pause:.0f} 秒，速率降至 {self.current_rate:.2f}/s"
+            )
+        elif self.rate and self.current_rate < self.rate:
+            self.current_rate = min(
+                self.rate, self.current_rate + self.rate * self.RECOVERY_FACTOR
+            )
+
+
+class HostGovernor:
+    """
+    进程内按主机共享的请求调度器，所有用户、所有关键词的请求都经过它。
+
+    HTTP 客户端在每次请求前从对应主机的 HostLimiter 获取名额，请求完成后把状态码反馈给它。
+    未配置的主机不受限制，只在收到 429/503 时按 Retry-After 暂停。
+    """
+
+    def __init__(self):
+        self._limiters: Dict[str, HostLimiter] = {}
+
+    def limiter(self, url: str) -> HostLimiter:
+        """
+        获取 URL 所属主机的限制器。
+
+        :param url: 请求地址或主机名。
+        :return: 该主机的 HostLimiter。
+        """
+        host = (urlsplit(url).hostname if "//" in url else None) or url
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = self._limiters[host] = HostLimiter(host)
+        return limiter
+
+    def configure(
+        self, url: str, rate: Optional[float] = None, max_inflight: Optional[int] = None
+    ):
+        """
+        配置主机的请求速率和并发上限，多次配置时取最严格的值。
+
+        :param url: 请求地址或主机名。
+        :param rate: 每秒允许的请求数，0 表示不限制。
+        :param max_inflight: 同时进行的请求数上限，0 表示不限制。
+        """
+        limiter = self.limiter(url)
+        limiter.configure(rate, max_inflight)
+        logger.info(
+            f"Request governor for {limiter.host}: rate {limiter.rate or '∞'}/s, max in-flight {limiter.max_inflight or '∞'}"
+        )
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """
+        在限制内执行一次请求。
+
+        :param url: 请求地址。
+        :yield: 该主机的 HostLimiter，用于反馈响应状态码。
+        """
+        limiter = self.limiter(url)
+        await limiter.acquire()
+        try:
+            yield limiter
+        finally:
+            await limiter.release()
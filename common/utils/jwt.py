@@ -1,9 +1,14 @@
+import asyncio
+import base64
+import hashlib
+import json
 import random
-from time import time
-from typing import Dict, Optional
+from time import monotonic, time
+from typing import Dict, List, Optional
 from uuid import UUID
 
-from ecdsa import SigningKey
+from ecdsa import NIST256p, SigningKey
+from ecdsa.util import sigencode_string
 from jose import jws
 from jose.backends.ecdsa_backend import ECDSAECKey
 from jose.constants import ALGORITHMS
@@ -31,3 +36,118 @@ def generate_dpop(
     }
 
     return jws.sign(payload, key, headers, ALGORITHMS.ES256)
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64url_json(data: dict) -> str:
+    return _b64url(json.dumps(data, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+
+
+def _dpop_payload(
+    url: str, method: str, extra_payload: Optional[Dict[str, str]] = None
+) -> dict:
+    return {
+        "iat": int(time()),
+        "jti": str(UUID(int=random.getrandbits(128))),
+        "htu": url,
+        "htm": method,
+        **(extra_payload or {}),
+    }
+
+
+class DPoPKey:
+    """
+    一个 ES256 签名密钥，JWT 头部（包含公钥 JWK）在创建时序列化一次，之后每次签名只需编码 payload。
+    """
+
+    def __init__(self, key: Optional[SigningKey] = None):
+        """
+        :param key: 签名密钥，默认生成一个新的 P-256 密钥。
+        """
+        self.key = key or SigningKey.generate(NIST256p)
+        point = self.key.get_verifying_key().pubkey.point
+        size = self.key.curve.baselen
+        jwk = {
+            "crv": "P-256",
+            "kty": "EC",
+            "x": _b64url(int(point.x()).to_bytes(size, "big")),
+            "y": _b64url(int(point.y()).to_bytes(size, "big")),
+        }
+        self.encoded_header = _b64url_json({"typ": "dpop+jwt", "alg": "ES256", "jwk": jwk})
+        self.created_at = monotonic()
+        self.uses = 0
+
+    def sign(self, payload: dict) -> str:
+        """
+        签名并返回 JWS 紧凑序列化格式的 JWT。
+
+        :param payload: JWT 的 payload。
+        :return: JWT 字符串。
+        """
+        signing_input = f"{self.encoded_header}.{_b64url_json(payload)}"
+        signature = self.key.sign(
+            signing_input.encode("ascii"),
+            hashfunc=hashlib.sha256,
+            sigencode=sigencode_string,
+        )
+        self.uses += 1
+        return f"{signing_input}.{_b64url(signature)}"
+
+
+class DPoPKeyPool:
+    """
+    轮换使用的 DPoP 密钥池。
+
+    密钥在多次请求之间复用，每个密钥签名 max_uses 次或使用超过 max_age 秒后被新密钥替换，
+    避免每个请求都生成新密钥并重新构造 JWK。
+    """
+
+    def __init__(self, size: int = 4, max_uses: int = 1000, max_age: float = 3600):
+        """
+        :param size: 同时使用的密钥数量。
+        :param max_uses: 每个密钥最多签名的次数。
+        :param max_age: 每个密钥最长的使用时间（秒）。
+        """
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self._keys: List[DPoPKey] = [DPoPKey() for _ in range(size)]
+        self._index = 0
+
+    def next_key(self) -> DPoPKey:
+        """
+        按顺序取出下一个密钥，过期的密钥在取出时替换。
+
+        :return: 可用的密钥。
+        """
+        index = self._index
+        self._index = (index + 1) % len(self._keys)
+        key = self._keys[index]
+        if key.uses >= self.max_uses or monotonic() - key.created_at >= self.max_age:
+            key = self._keys[index] = DPoPKey()
+        return key
+
+    def sign(
+        self, url: str, method: str, extra_payload: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        生成 DPoP 证明。
+
+        :param url: 请求地址。
+        :param method: 请求方法。
+        :param extra_payload: 额外的 payload 字段。
+        :return: DPoP JWT。
+        """
+        return self.next_key().sign(_dpop_payload(url, method, extra_payload))
+
+    async def sign_async(
+        self, url: str, method: str, extra_payload: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        在线程池中签名，ECDSA 的计算不占用事件循环。参数同 sign。
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.next_key().sign, _dpop_payload(url, method, extra_payload)
+        )
@@ -0,0 +1,102 @@
+from typing import Callable, Dict, Optional
+
+# 根据商品 ID 推导 URL 的函数，无法推导时返回 None
+UrlBuilder = Callable[[str], Optional[str]]
+
+
+def is_mercari_item_id(id: str) -> bool:
+    """煤炉个人卖家的商品 ID 形如 m123456789，煤炉 Shops 的商品 ID 为其他格式。"""
+    return bool(id) and id[0] == "m" and id[1:].isdigit()
+
+
+def mercari_product_url(id: str) -> str:
+    if is_mercari_item_id(id):
+        return "https://jp.mercari.com/item/{}".format(id)
+    return "https://mercari-shops.com/products/{}".format(id)
+
+
+def mercari_image_url(id: str) -> Optional[str]:
+    if is_mercari_item_id(id):
+        # return "https://static.mercdn.net/item/detail/orig/photos/{}_1.jpg".format(id)
+        return "https://static.mercdn.net/c!/w=360,f=webp/item/detail/orig/photos/{}_1.jpg".format(
+            id
+        )
+    return None  # 煤炉 Shops 的图片地址只能从接口返回的 thumbnails 中获取
+
+
+def paypay_product_url(id: str) -> str:
+    return f"https://paypayfleamarket.yahoo.co.jp/item/{id}"
+
+
+def suruga_product_url(id: str) -> str:
+    return f"https://www.suruga-ya.jp/product/other/{id}"
+
+
+def suruga_image_url(id: str) -> str:
+    return f"https://www.suruga-ya.jp/database/photo.php?shinaban={id}&size=m"
+
+
+class UrlCodec:
+    """
+    站点的 URL 编解码器。
+
+    对于 URL 完全由商品 ID 决定的站点，只保存与推导结果不同的 URL（否则保存 None），
+    读取时再根据 ID 重建，从而减少数据库和内存中重复的 URL 字符串。
+    """
+
+    def __init__(
+        self,
+        product_url: Optional[UrlBuilder] = None,
+        image_url: Optional[UrlBuilder] = None,
+    ):
+        self._builders = {"product_url": product_url, "image_url": image_url}
+
+    def encode(self, field: str, id: str, url: Optional[str]) -> Optional[str]:
+        """
+        编码 URL。
+
+        :param field: "product_url" 或 "image_url"。
+        :param id: 商品 ID。
+        :param url: 完整的 URL。
+        :return: 能由 ID 推导出的 URL 返回 None，否则原样返回。
+        """
+        builder = self._builders[field]
+        if url is not None and builder is not None and url == builder(id):
+            return None
+        return url
+
+    def decode(self, field: str, id: str, stored: Optional[str]) -> Optional[str]:
+        """
+        解码 URL。
+
+        :param field: "product_url" 或 "image_url"。
+        :param id: 商品 ID。
+        :param stored: 保存的值。
+        :return: 完整的 URL。
+        """
+        if stored is not None:
+            return stored
+        builder = self._builders[field]
+        return builder(id) if builder is not None else None
+
+
+# 各站点的 URL 编解码器，键为站点名（SearchResultItem.site / website_keywords.website）
+URL_CODECS: Dict[str, UrlCodec] = {
+    "mercari": UrlCodec(mercari_product_url, mercari_image_url),
+    "mercari_user": UrlCodec(mercari_product_url, mercari_image_url),
+    "paypay": UrlCodec(paypay_product_url),
+    "suruga": UrlCodec(suruga_product_url, suruga_image_url),
+}
+
+# 没有可推导 URL 的站点使用的编解码器，原样保存
+IDENTITY_CODEC = UrlCodec()
+
+
+def get_url_codec(site: str) -> UrlCodec:
+    """
+    获取站点的 URL 编解码器。
+
+    :param site: 站点名。
+    :return: 对应的 UrlCodec，未注册的站点返回原样保存的编解码器。
+    """
+    return URL_CODECS.get(site, IDENTITY_CODEC)
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+
+from loguru import logger
+
+from common import ProductDatabase
+from common.database.migrations import LATEST_VERSION, get_schema_version
+
+
+def fetch_database_paths(base_path, direct_user_path=None):
+    """
+    Retrieve database paths of the user directories, same layout as main.py.
+    """
+    user_dirs = (
+        [direct_user_path]
+        if direct_user_path
+        else [entry.path for entry in os.scandir(base_path) if entry.is_dir()]
+    )
+    return [
+        f"{user_dir}/data/database.db"
+        for user_dir in user_dirs
+        if os.path.exists(f"{user_dir}/data/database.db")
+    ]
+
+
+async def recount(database: ProductDatabase):
+    """
+    Rebuild product_count_1 / product_count_2 of every keyword from the keyword_items table.
+    """
+    drift = await database.engine.run(database.verify_product_counts)
+    await database.engine.run(database.recount_product_counts)
+    logger.info(f"{database.db_name}: recounted, {len(drift)} keywords repaired")
+
+
+async def verify(database: ProductDatabase):
+    """
+    Report keywords whose incremental counters drifted from the keyword_items table.
+    """
+    drift = await database.engine.run(database.verify_product_counts)
+    for keyword_id, website, keyword, count_1, actual_1, count_2, actual_2 in drift:
+        logger.warning(
+            f"{database.db_name}: [{keyword_id}] {website}: {keyword} "
+            f"product_count_1 {count_1} != {actual_1}, product_count_2 {count_2} != {actual_2}"
+        )
+    if not drift:
+        logger.info(f"{database.db_name}: all counters are consistent")
+    return not drift
+
+
+def version(database_path):
+    """
+    Print the schema version. Read on a plain read-only connection, because opening
+    a ProductDatabase would migrate the file to the latest version first.
+    """
+    conn = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    try:
+        current = get_schema_version(conn)
+    finally:
+        conn.close()
+    logger.info(f"{database_path}: schema version {current} (latest {LATEST_VERSION})")
+
+
+async def run(command, database_paths):
+    ok = True
+    for database_path in database_paths:
+        if command == "version":
+            version(database_path)
+            continue
+        database = ProductDatabase(database_path)
+        try:
+            await database.initialize(warm_cache=False)
+            result = await COMMANDS[command](database)
+            ok = ok and result is not False
+        finally:
+            database.close()
+    return ok
+
+
+COMMANDS = {
+    "recount": recount,
+    "verify": verify,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline maintenance for user databases. Stop main.py before running it."
+    )
+    parser.add_argument("command", choices=[*COMMANDS, "version"])
+    parser.add_argument(
+        "-r",
+        "--base-path",
+        help="Base directory path to look for user directories.",
+        default="user",
+    )
+    parser.add_argument(
+        "-u", "--user-path", help="Direct path to a specific user directory."
+    )
+
+    args = parser.parse_args()
+
+    paths = fetch_database_paths(args.base_path, args.user_path)
+    if not paths:
+        logger.error("No database found.")
+        sys.exit(1)
+
+    sys.exit(0 if asyncio.run(run(args.command, paths)) else 1)
@@ -6,8 +6,10 @@ from telebot import asyncio_helper
 import argparse
 from loguru import logger
 import sys
-from monitor import setup_and_monitor
-from common import AsyncHTTPXClient, AsyncAIOHTTPClient
+from monitor import setup_and_monitor, SearchBus, SearchScheduler
+from common import AsyncHTTPXClient, AsyncAIOHTTPClient, HostGovernor
+from website.base.parse_executor import ParseExecutor
+from website.base.scraper import BaseScrapy
 
 class MonitoringController:
     def __init__(self, base_path="user", direct_user_path=None):
@@ -23,7 +25,9 @@ class MonitoringController:
         self.direct_user_path = direct_user_path
         self.http_client = None
         self.telegram_bots = {}
-        
+        self.scheduler = None
+        self.search_bus = None
+
     async def initialize_resources(self, parse_mode=None):
         """
         Initializes the necessary resources for monitoring.
@@ -56,6 +60,9 @@ class MonitoringController:
 
         # Initialize http client
 
+        # 所有用户共享的按主机请求限制，各网站的限制在启动监控时根据配置设置
+        governor = HostGovernor()
+
         http_client_type = os.getenv('HTTP_CLIENT')
 
         if http_client_type == "httpx":
@@ -66,6 +73,7 @@ class MonitoringController:
                 proxy=proxy,
                 redirects=True,
                 ssl_verify=False,
+                governor=governor,
             )
         else:
             # 默认使用 AsyncAIOHTTPClient
@@ -75,8 +83,16 @@ class MonitoringController:
                 proxy=proxy,
                 redirects=True,
                 ssl_verify=False,
+                governor=governor,
             )
 
+        # 所有用户的搜索由同一个调度器排期，相同的搜索通过搜索结果总线只抓取一次
+        self.scheduler = SearchScheduler.from_env()
+        self.search_bus = SearchBus(self.scheduler)
+
+        # 可选的 HTML 解析进程池，所有用户的爬虫共享
+        BaseScrapy.parse_executor = ParseExecutor.from_env()
+
         # Initialize telegram bots
         asyncio_helper.REQUEST_TIMEOUT = timeout
         asyncio_helper.proxy = proxy or None
@@ -109,10 +125,19 @@ class MonitoringController:
         This method closes the http_client and telegram bot resources.
         """
         logger.info("Closing http_client and telegram bot resources")
+        if self.scheduler:
+            await self.scheduler.stop()
+            logger.info("scheduler has stopped")
+
         if self.http_client:
             await self.http_client.close()
             logger.info("http_client has closed")
 
+        if BaseScrapy.parse_executor:
+            BaseScrapy.parse_executor.shutdown()
+            BaseScrapy.parse_executor = None
+            logger.info("parse executor has closed")
+
         for index, bot in self.telegram_bots.items():
             await bot.close_session()
             logger.info(f"telegram bot: {index} has closed")
@@ -140,11 +165,17 @@ class MonitoringController:
         logger.info("Starting VintageVigil...")
         await self.initialize_resources(parse_mode="Markdown")
         user_directories = self.fetch_user_directories()
+        self.scheduler.start()
 
         monitor_tasks = [
             asyncio.create_task(
                 setup_and_monitor(
-                    user_dir, self.is_running, self.http_client, self.telegram_bots
+                    user_dir,
+                    self.is_running,
+                    self.http_client,
+                    self.telegram_bots,
+                    self.scheduler,
+                    self.search_bus,
                 )
             )
             for user_dir in user_directories
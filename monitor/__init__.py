@@ -1 +1,3 @@
 from .monitor_main import setup_and_monitor
+from .search_bus import SearchBus
+from .scheduler import SearchScheduler
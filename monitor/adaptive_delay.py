@@ -0,0 +1,66 @@
+import time
+from typing import Optional
+
+
+class AdaptiveDelay:
+    """
+    根据关键词的变化事件（上新、补货、价格变动）频率调整监控间隔。
+
+    每轮结束时用本轮的事件数除以距上一轮的时间得到一个频率样本，再做指数加权移动平均（EWMA）。
+    间隔取平均每轮发现 TARGET_EVENTS 个事件所需的时间，并限制在 [min_delay, max_delay] 之间：
+    频繁上新的关键词更快被检查，长期没有变化的关键词逐渐放慢到 max_delay。
+    """
+
+    # 新样本的权重
+    SMOOTHING = 0.3
+    # 期望每轮发现的事件数
+    TARGET_EVENTS = 1.0
+
+    def __init__(self, min_delay: float, max_delay: float, initial_delay: float):
+        """
+        :param min_delay: 最短间隔（秒）。
+        :param max_delay: 最长间隔（秒）。
+        :param initial_delay: 还没有频率数据时使用的间隔（秒）。
+        """
+        self.min_delay = min_delay
+        self.max_delay = max(min_delay, max_delay)
+        self.event_rate: Optional[float] = None  # 每秒事件数
+        self.delay = self._clamp(initial_delay)
+        self._last_observed: Optional[float] = None
+
+    def restore(self, event_rate: Optional[float]):
+        """
+        恢复上次运行保存的事件频率。
+
+        :param event_rate: 每秒事件数，没有记录时为 None。
+        """
+        if event_rate is not None:
+            self.event_rate = event_rate
+            self.delay = self._delay_for(event_rate)
+
+    def observe(self, events: int, now: Optional[float] = None) -> Optional[float]:
+        """
+        记录一轮监控发现的事件数并更新间隔。第一次调用只记录时间。
+
+        :param events: 本轮的事件数。
+        :param now: 本轮结束的时间，默认为当前时间。
+        :return: 更新后的每秒事件数。
+        """
+        now = time.monotonic() if now is None else now
+        if self._last_observed is not None and now > self._last_observed:
+            sample = events / (now - self._last_observed)
+            if self.event_rate is None:
+                self.event_rate = sample
+            else:
+                self.event_rate += self.SMOOTHING * (sample - self.event_rate)
+            self.delay = self._delay_for(self.event_rate)
+        self._last_observed = now
+        return self.event_rate
+
+    def _delay_for(self, event_rate: float) -> float:
+        if event_rate <= 0:
+            return self.max_delay
+        return self._clamp(self.TARGET_EVENTS / event_rate)
+
+    def _clamp(self, delay: float) -> float:
+        return min(self.max_delay, max(self.min_delay, delay))
@@ -60,7 +60,12 @@ class InitializationManager:
 
             # Setup database
             database_path = f"{user_dir}/data/database.db"
-            database = ProductDatabase(database_path)
+            state_cache_max_entries = os.getenv("STATE_CACHE_MAX_ENTRIES")
+            database = ProductDatabase(
+                database_path,
+                int(state_cache_max_entries) if state_cache_max_entries else None,
+            )
+            await database.initialize()
 
             # Initialize notification clients
             notification_clients = await self.setup_notification_clients(
@@ -0,0 +1,39 @@
+from loguru import logger
+import asyncio
+
+# 数据库维护任务的执行间隔（秒）
+MAINTENANCE_INTERVAL = 6 * 60 * 60
+
+
+def _days_by_website(config, key):
+    """
+    Collect a per-website day setting; the longest window wins and 0 (never) beats any window.
+    """
+    days_by_website = {}
+    for website in config.websites:
+        for search_query in website[1:]:
+            website_name = search_query["website_name"]
+            days = search_query[key]
+            current = days_by_website.get(website_name)
+            if current is None:
+                days_by_website[website_name] = days
+            elif current != 0:
+                days_by_website[website_name] = 0 if days == 0 else max(current, days)
+    return days_by_website
+
+
+async def run_database_maintenance(config, database, user_dir, is_running):
+    """
+    Periodically compact the price history, prune stale products and reclaim free pages
+    of a user's database.
+    """
+    retention_days = _days_by_website(config, "history_retention_days")
+    prune_after_days = _days_by_website(config, "prune_after_days")
+    while is_running:
+        await asyncio.sleep(MAINTENANCE_INTERVAL)
+        try:
+            await database.compact_price_history(retention_days)
+            await database.prune_stale_products(prune_after_days)
+            await database.incremental_vacuum()
+        except Exception as e:
+            logger.error(f"Error during database maintenance for {user_dir}: {e}")
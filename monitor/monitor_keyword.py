@@ -1,63 +1,174 @@
 from loguru import logger
-import asyncio
 from string import Template
+import hashlib
+import json
+import time
 
+from .adaptive_delay import AdaptiveDelay
 from .send_notification import process_item
 from common.utils import extract_keyword_from_url
 
 
-async def process_search_keyword(
-    scraper,
-    search_query,
-    database,
-    notification_clients,
-    user_dir,
-    is_running,
-):
+class KeywordJob:
     """
-    Process a given search keyword for a website and execute necessary operations.
+    A search keyword of one user, run once per scheduler turn.
+    Crawls on its own, or diffs and notifies the pages of a shared search when subscribed to the search bus.
     """
-    with logger.contextualize(
-        website_name=search_query["website_name"],
-        keyword=search_query["keyword"],
-        user_path=user_dir,
+
+    def __init__(
+        self,
+        scraper,
+        search_query,
+        database,
+        notification_clients,
+        user_dir,
+        is_running,
     ):
-        iteration_count = 0
-        message_template = Template(search_query["msg_tpl"])
-        while is_running:
+        self.scraper = scraper
+        self.search_query = search_query
+        self.database = database
+        self.notification_clients = notification_clients
+        self.user_dir = user_dir
+        self.is_running = is_running
+        self.iteration_count = 0
+        self.message_template = Template(search_query["msg_tpl"])
+        self.adaptive_delay = (
+            AdaptiveDelay(
+                search_query["min_delay"],
+                search_query["max_delay"],
+                search_query["delay"],
+            )
+            if search_query["adaptive_delay"]
+            else None
+        )
+        self.spec_hash = search_spec_hash(search_query)
+
+    @property
+    def name(self):
+        return f"{self.search_query['website_name']} : {extract_keyword_from_url(self.search_query['keyword'])}"
+
+    @property
+    def delay(self):
+        if self.adaptive_delay:
+            return self.adaptive_delay.delay
+        return self.search_query["delay"]
+
+    async def restore(self):
+        """
+        Restore the crawl state saved by a previous run. A keyword whose baseline was built with
+        the same search spec resumes in incremental mode instead of repeating the iteration-0 crawl.
+        """
+        search_query = self.search_query
+        website, keyword = search_query["website_name"], search_query["keyword"]
+        baseline_hash, last_crawled_at = await self.database.get_crawl_state(
+            website, keyword
+        )
+        if baseline_hash == self.spec_hash:
+            self.iteration_count = 1
+            logger.info(
+                f"{self.name} 已完成首轮抓取（最近一次: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_crawled_at or 0))}），跳过首轮全量抓取"
+            )
+        if self.adaptive_delay:
+            self.adaptive_delay.restore(
+                await self.database.get_event_rate(website, keyword)
+            )
+
+    async def run(self):
+        """
+        Crawl the keyword once and process the results.
+        """
+        await self.process_pages(
+            iter_product_pages(
+                self.scraper,
+                self.search_query,
+                self.iteration_count,
+                self.is_running,
+                self.search_query["user_max_pages"],
+            )
+        )
+
+    async def process_pages(self, pages):
+        """
+        Diff the pages of one iteration against the database and notify the changes.
+        """
+        if not self.is_running:
+            return
+        search_query = self.search_query
+        with logger.contextualize(
+            website_name=search_query["website_name"],
+            keyword=search_query["keyword"],
+            user_path=self.user_dir,
+        ):
             try:
-                logger.info(f"--------- Start of iteration {iteration_count} ---------")
-                logger.info(
-                    f"{search_query['website_name']} : {extract_keyword_from_url(search_query['keyword'])} 开始监控"
-                )
-                products_to_process = await _collect_products(
-                    scraper,
-                    search_query,
-                    iteration_count,
-                    is_running,
-                    search_query["user_max_pages"],
-                )
-
-                for item in database.upsert_products(
-                    products_to_process,
-                    search_query["keyword"],
-                    search_query["website_name"],
-                    search_query["push_price_changes"],
-                ):
-                    if iteration_count > 0:
-                        await process_item(
-                            item,
-                            search_query,
-                            message_template,
-                            notification_clients,
-                        )
-
-                logger.info(f"--------- End of iteration {iteration_count} ---------\n")
-                iteration_count += 1
-                await asyncio.sleep(search_query["delay"])
+                logger.info(f"--------- Start of iteration {self.iteration_count} ---------")
+                logger.info(f"{self.name} 开始监控")
+                # Change counts come from the diff itself, so price changes feed the adaptive
+                # delay even when push_price_changes is off.
+                counts = {}
+                pages_seen = 0
+                async for products_to_process in pages:
+                    if products_to_process:
+                        pages_seen += 1
+                    async for item in self.database.upsert_products(
+                        products_to_process,
+                        search_query["keyword"],
+                        search_query["website_name"],
+                        search_query["push_price_changes"],
+                        counts,
+                    ):
+                        if self.iteration_count > 0:
+                            await process_item(
+                                item,
+                                search_query,
+                                self.message_template,
+                                self.notification_clients,
+                                self.database,
+                            )
+
+                if self.adaptive_delay:
+                    events = sum(counts.values()) if self.iteration_count > 0 else 0
+                    await self._update_delay(events)
+                # Only a finished iteration that returned results is a usable baseline;
+                # a failed or cancelled crawl never reaches this point.
+                if pages_seen:
+                    await self.database.save_crawl_state(
+                        search_query["website_name"],
+                        search_query["keyword"],
+                        self.spec_hash,
+                        int(time.time()),
+                    )
+                logger.info(f"--------- End of iteration {self.iteration_count} ---------\n")
+                self.iteration_count += 1
             except Exception as e:
                 logger.error(f"Error processing search keyword: {e}")
 
+    async def _update_delay(self, events):
+        """
+        Feed the change events of this iteration into the adaptive delay and persist the learned rate.
+        """
+        search_query = self.search_query
+        event_rate = self.adaptive_delay.observe(events)
+        if event_rate is not None:
+            await self.database.save_event_rate(
+                search_query["website_name"], search_query["keyword"], event_rate
+            )
+        logger.info(f"{self.name} 自适应监控间隔: {self.adaptive_delay.delay:.0f} 秒")
+
+
+def search_spec_hash(search_query) -> int:
+    """
+    Hash of the search spec a baseline is built with. Changing the filter or the page cap
+    invalidates the baseline, so the keyword pays for a new iteration-0 crawl.
+    """
+    spec = json.dumps(
+        [search_query["filter"], search_query["user_max_pages"]],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    digest = hashlib.blake2b(spec.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
 
 async def _collect_products(
     scraper, search_query, iteration_count, is_running, user_max_pages
@@ -68,3 +179,31 @@ async def _collect_products(
             break
         products.add(product)
     return products
+
+
+async def iter_product_pages(
+    scraper, search_query, iteration_count, is_running, user_max_pages
+):
+    """
+    按页返回本轮的搜索结果，每完成一页就交给数据库比对和推送，同一轮中重复出现的商品只保留第一次。
+    不支持按页搜索的爬虫，或者关闭了 stream_pages 时，整轮结果作为一页返回。
+    """
+    if not (search_query["stream_pages"] and hasattr(scraper, "search_pages")):
+        yield await _collect_products(
+            scraper, search_query, iteration_count, is_running, user_max_pages
+        )
+        return
+
+    seen_ids = set()
+    async for page_products in scraper.search_pages(
+        search_query, iteration_count, user_max_pages
+    ):
+        if not is_running:
+            break
+        products = []
+        for product in page_products:
+            if product.id not in seen_ids:
+                seen_ids.add(product.id)
+                products.append(product)
+        if products:
+            yield products
@@ -3,6 +3,7 @@ import asyncio
 
 from .monitor_website import monitor_site
 from .initialization import InitializationManager
+from .maintenance import run_database_maintenance
 
 
 async def _load_user_configuration(user_dir, http_client, telegram_bots):
@@ -17,7 +18,9 @@ async def _load_user_configuration(user_dir, http_client, telegram_bots):
         return None, None, None
 
 
-async def setup_and_monitor(user_dir, is_running, http_client, telegram_bots):
+async def setup_and_monitor(
+    user_dir, is_running, http_client, telegram_bots, scheduler, search_bus=None
+):
     """
     Setup and start monitoring for a specific user.
     """
@@ -36,9 +39,14 @@ async def setup_and_monitor(user_dir, is_running, http_client, telegram_bots):
                     user_dir,
                     is_running,
                     http_client,
+                    scheduler,
+                    search_bus,
                 )
                 for website in config.websites
             ]
+            website_tasks.append(
+                run_database_maintenance(config, database, user_dir, is_running)
+            )
             await asyncio.gather(*website_tasks, return_exceptions=True)
         except KeyboardInterrupt:
             logger.error("KeyboardInterrupt caught, shutting down...")
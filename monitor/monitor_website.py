@@ -1,25 +1,39 @@
 from .scraper_manager import fetch_scraper
 from string import Template
 from loguru import logger
-import asyncio
 
-from .monitor_keyword import process_search_keyword
+from .monitor_keyword import KeywordJob
 
 
 async def monitor_site(
-    site_config, database, notification_clients, user_dir, is_running, http_client
+    site_config,
+    database,
+    notification_clients,
+    user_dir,
+    is_running,
+    http_client,
+    scheduler,
+    search_bus=None,
 ):
     """
     Monitor a specific website for changes in product information.
+    The searches are registered with the shared scheduler, or with the search bus
+    when identical searches of other users should share one crawl.
     """
     logger.info(f"Starting monitoring for site: {site_config[0]}")
 
     scraper = fetch_scraper(site_config[1]['website_name'], http_client)
 
     if scraper and site_config[1:]:
+        # 同一网站的所有用户共享该主机的请求速率和并发上限
+        http_client.governor.configure(
+            getattr(scraper, "base_url", None) or scraper.root_url,
+            rate=site_config[1]["rate_limit"],
+            max_inflight=site_config[1]["max_inflight"],
+        )
         await scraper.async_init()
-        search_tasks = [
-            process_search_keyword(
+        jobs = [
+            KeywordJob(
                 scraper,
                 search_query,
                 database,
@@ -29,6 +43,22 @@ async def monitor_site(
             )
             for search_query in site_config[1:]
         ]
-        await asyncio.gather(*search_tasks, return_exceptions=True)
+        for job in jobs:
+            try:
+                await job.restore()
+            except Exception as e:
+                logger.error(f"Error restoring crawl state for {job.name}: {e}")
+            if search_bus:
+                search_bus.subscribe(job)
+            else:
+                scheduler.add(job)
+        try:
+            await scheduler.wait_closed()
+        finally:
+            for job in jobs:
+                if search_bus:
+                    search_bus.unsubscribe(job)
+                else:
+                    scheduler.remove(job)
 
     logger.info(f"Monitoring ended for site: {site_config[0]}")
@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+class SearchScheduler:
+    """
+    所有搜索任务共用的调度器。
+
+    每个任务只是堆中的一个 (下次运行时间, 序号, 任务) 条目，由一个调度协程按时间顺序取出执行，
+    不再为每个关键词保留一个休眠中的协程。首轮启动时间随机分散，之后每轮的间隔带有随机浮动，
+    同时运行的任务数受全局上限约束。
+
+    任务需要提供 name、delay 属性和 async run() 方法，每次 run() 完成后按当时的 delay 重新排期。
+    """
+
+    # 首轮启动时间分散到的最长秒数（不超过任务自身的 delay）
+    START_JITTER = 60
+    # 每轮间隔的随机浮动比例
+    JITTER = 0.1
+
+    def __init__(self, max_running: int = 0):
+        """
+        :param max_running: 同时运行的任务数上限，0 表示不限制。
+        """
+        self.max_running = max_running
+        self._heap: List[Tuple[float, int, object]] = []
+        self._counter = itertools.count()
+        # 任务 -> 下次运行时间，运行中的任务为 None；堆中时间不一致的条目视为已失效
+        self._jobs: Dict[object, Optional[float]] = {}
+        self._running = set()
+        self._budget = asyncio.Semaphore(max_running) if max_running else None
+        self._wakeup = asyncio.Event()
+        self._closed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "SearchScheduler":
+        """
+        根据环境变量 MAX_RUNNING_SEARCHES 创建调度器，默认同时运行 32 个搜索，0 表示不限制。
+        """
+        return cls(int(os.getenv("MAX_RUNNING_SEARCHES", "32") or 0))
+
+    def start(self):
+        """启动调度协程。"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        """停止调度，取消正在运行的任务。"""
+        self._closed.set()
+        tasks = [task for task in (self._task, *self._running) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    async def wait_closed(self):
+        """等待调度器停止。"""
+        await self._closed.wait()
+
+    def add(self, job, delay: Optional[float] = None):
+        """
+        添加任务。
+
+        :param job: 搜索任务。
+        :param delay: 距首次运行的秒数，默认在 START_JITTER 内随机分散。
+        """
+        if delay is None:
+            delay = random.uniform(0, min(job.delay, self.START_JITTER))
+        self._push(job, time.monotonic() + delay)
+
+    def remove(self, job):
+        """移除任务，正在运行的任务完成本轮后不再排期。"""
+        self._jobs.pop(job, None)
+
+    def next_runs(self) -> List[Tuple[str, float]]:
+        """
+        :return: 按时间排序的 (任务名, 下次运行的 Unix 时间戳)，运行中的任务不包含在内。
+        """
+        offset = time.time() - time.monotonic()
+        return sorted(
+            (
+                (job.name, next_run + offset)
+                for job, next_run in self._jobs.items()
+                if next_run is not None
+            ),
+            key=lambda entry: entry[1],
+        )
+
+    def _push(self, job, next_run: float):
+        self._jobs[job] = next_run
+        heapq.heappush(self._heap, (next_run, next(self._counter), job))
+        self._wakeup.set()
+
+    def _jittered(self, delay: float) -> float:
+        return delay * random.uniform(1 - self.JITTER, 1 + self.JITTER)
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            # 丢弃已移除或已重新排期的条目
+            while self._heap and self._jobs.get(self._heap[0][2], -1) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            next_run, _, job = self._heap[0]
+            wait = next_run - time.monotonic()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if self._budget:
+                await self._budget.acquire()
+                # 等待名额期间任务可能已被移除
+                if self._jobs.get(job, -1) != next_run:
+                    self._budget.release()
+                    continue
+            heapq.heappop(self._heap)
+            self._jobs[job] = None
+            task = asyncio.create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, job):
+        try:
+            await job.run()
+        except Exception as e:
+            logger.error(f"Error running search {job.name}: {e}")
+        finally:
+            if self._budget:
+                self._budget.release()
+            if job in self._jobs:
+                self._push(job, time.monotonic() + self._jittered(job.delay))
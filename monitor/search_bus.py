@@ -0,0 +1,156 @@
+import asyncio
+import json
+from copy import copy
+from typing import AsyncGenerator, Dict, List, Tuple
+
+from loguru import logger
+
+from common.utils import extract_keyword_from_url
+
+from .monitor_keyword import iter_product_pages
+
+# 标准化的搜索条件: (网站, 关键词, 过滤条件, 最大页数, 抓取方式)
+SearchKey = Tuple[str, str, str, int, str]
+
+# 决定抓取方式的配置，共享搜索按第一个订阅者的配置抓取，因此这些配置也必须一致才能合并
+CRAWL_SETTINGS = (
+    "incremental_crawl",
+    "full_sweep_interval",
+    "score_sweep_interval",
+    "stream_pages",
+    "max_concurrency",
+)
+
+
+def search_key(search_query) -> SearchKey:
+    """
+    根据影响抓取结果和抓取方式的配置生成标准化的搜索条件，条件相同的搜索会被合并。
+
+    :param search_query: 搜索配置。
+    :return: 可哈希的搜索条件。
+    """
+    return (
+        search_query["website_name"],
+        search_query["keyword"].strip(),
+        json.dumps(search_query["filter"], sort_keys=True, ensure_ascii=False, default=str),
+        search_query["user_max_pages"],
+        json.dumps([search_query[name] for name in CRAWL_SETTINGS], default=str),
+    )
+
+
+class SearchAborted(Exception):
+    """共享搜索的抓取被取消，订阅者收到的本轮结果不完整。"""
+
+
+async def _drain(queue: asyncio.Queue) -> AsyncGenerator[list, None]:
+    """按页返回队列中的商品，None 表示本轮结束，异常表示本轮抓取失败。"""
+    while True:
+        products = await queue.get()
+        if products is None:
+            return
+        if isinstance(products, Exception):
+            raise products
+        yield products
+
+
+class SearchChannel:
+    """
+    一个共享搜索：同一搜索条件在每个间隔内只抓取一次，结果分发给所有订阅者各自的比对与推送流程。
+    作为调度器中的一个任务运行，间隔取所有订阅者中最短的 delay。
+    """
+
+    def __init__(self, key: SearchKey, scraper, search_query, is_running):
+        self.key = key
+        self.scraper = scraper
+        self.search_query = search_query
+        self.is_running = is_running
+        self.subscribers: List = []
+
+    @property
+    def name(self):
+        return f"{self.key[0]} : {extract_keyword_from_url(self.key[1])}"
+
+    @property
+    def delay(self):
+        return min(job.delay for job in self.subscribers)
+
+    async def run(self):
+        subscribers = list(self.subscribers)
+        if not (self.is_running and subscribers):
+            return
+        if len(subscribers) > 1:
+            logger.info(f"{self.name} 共享搜索，订阅用户数 {len(subscribers)}")
+
+        # 按订阅者中最小的轮次抓取：还没有完成首轮的订阅者需要一次完整深度的抓取作为比对基准
+        iteration_count = min(job.iteration_count for job in subscribers)
+        queues = [asyncio.Queue() for _ in subscribers]
+        consumers = [
+            asyncio.ensure_future(job.process_pages(_drain(queue)))
+            for job, queue in zip(subscribers, queues)
+        ]
+        end = None
+        try:
+            async for products in iter_product_pages(
+                self.scraper,
+                self.search_query,
+                iteration_count,
+                self.is_running,
+                self.search_query["user_max_pages"],
+            ):
+                # 每个用户的比对流程会修改商品的 price_change/pre_price，因此分发副本
+                queues[0].put_nowait(products)
+                for queue in queues[1:]:
+                    queue.put_nowait([copy(product) for product in products])
+        except BaseException as e:
+            # 取消也要通知订阅者本轮失败，否则不完整的结果会被当作完整的一轮保存
+            end = e if isinstance(e, Exception) else SearchAborted(f"{self.name} 抓取被取消")
+            raise
+        finally:
+            for queue in queues:
+                queue.put_nowait(end)
+            await asyncio.gather(*consumers, return_exceptions=True)
+
+
+class SearchBus:
+    """
+    进程内共享的搜索结果总线：多个用户以相同的抓取配置监控相同的 (网站, 关键词, 过滤条件) 时只抓取一次。
+    """
+
+    def __init__(self, scheduler):
+        """
+        :param scheduler: 运行共享搜索的调度器。
+        """
+        self.scheduler = scheduler
+        self._channels: Dict[SearchKey, SearchChannel] = {}
+
+    def subscribe(self, job):
+        """
+        订阅一个搜索，条件相同的搜索共享同一个抓取任务，第一个订阅者的爬虫用于抓取。
+
+        :param job: 订阅者的 KeywordJob。
+        """
+        key = search_key(job.search_query)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = SearchChannel(
+                key, job.scraper, job.search_query, job.is_running
+            )
+            channel.subscribers.append(job)
+            self.scheduler.add(channel)
+        else:
+            channel.subscribers.append(job)
+
+    def unsubscribe(self, job):
+        """
+        取消订阅，最后一个订阅者离开时共享搜索从调度器中移除。
+
+        :param job: 订阅者的 KeywordJob。
+        """
+        key = search_key(job.search_query)
+        channel = self._channels.get(key)
+        if channel is None or job not in channel.subscribers:
+            return
+        channel.subscribers.remove(job)
+        if not channel.subscribers:
+            del self._channels[key]
+            self.scheduler.remove(channel)
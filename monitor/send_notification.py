@@ -8,8 +8,21 @@ async def process_item(
     search_query,
     message_template,
     notification_clients,
+    database=None,
 ):
-    message = _create_notification_message(item, message_template, search_query)
+    lowest_price = None
+    if database and "lowestPrice" in message_template.template:
+        lowest_price = await database.get_lowest_price(
+            search_query["website_name"], item.id
+        )
+        # 本轮的价格历史还没有写入数据库，当前在售价格需要单独参与比较
+        if item.status != 0 and item.price > 0:
+            lowest_price = (
+                item.price if lowest_price is None else min(lowest_price, item.price)
+            )
+    message = _create_notification_message(
+        item, message_template, search_query, lowest_price
+    )
     try:
         logger.info(
             f"{search_query['website_name']}: {extract_keyword_from_url(search_query['keyword'])} {item.product_url} {get_price_status_string(item.price_change)}"
@@ -31,7 +44,7 @@ async def process_item(
         logger.error(f"Error preparing notification: {e}")
 
 
-def _create_notification_message(item, message_template, search_query):
+def _create_notification_message(item, message_template, search_query, lowest_price=None):
     price_currency = item.price * search_query["exchange_rate"]
     price = f"{item.pre_price} 円 ==> {item.price}" if item.pre_price else item.price
     return message_template.safe_substitute(
@@ -44,4 +57,5 @@ def _create_notification_message(item, message_template, search_query):
         productURL=item.product_url,
         site=item.site,
         keyword=extract_keyword_from_url(search_query["keyword"]),
+        lowestPrice=lowest_price if lowest_price is not None else item.price,
     )
@@ -3,5 +3,5 @@ import httpx
 import re
 import json
 from loguru import logger
-from typing import AsyncGenerator, List, Optional
+from typing import AsyncGenerator, Dict, List, Optional, Union
 from .search_result_item import SearchResultItem
\ No newline at end of file
@@ -0,0 +1,102 @@
+import asyncio
+import inspect
+from typing import List
+
+from .search_result_item import SearchResultItem
+
+
+class ProductExtractor:
+    """
+    把一页商品卡片转换为 SearchResultItem 的公共逻辑。
+
+    get_item_* 取值函数都是同步的，一整页商品在一次同步调用中完成转换，不再为每个字段、每个商品创建协程。
+    仍然使用异步 get_item_* 的子类会自动退回到逐个 await 的兼容路径。
+    """
+
+    async def parse_items(self, items) -> List[SearchResultItem]:
+        """
+        将一页商品卡片转换为商品对象。
+
+        :param items: 商品卡片列表，json 字典或者 Selector。
+        :return: 成功解析的商品列表。
+        """
+        if not items:
+            return []
+        if inspect.iscoroutinefunction(self.get_item_id):
+            tasks = [self.create_product_from_card(item) for item in items]
+            products = await asyncio.gather(*tasks, return_exceptions=True)
+            return [
+                product for product in products if isinstance(product, SearchResultItem)
+            ]
+        return self.extract_products(items)
+
+    def extract_products(self, items) -> List[SearchResultItem]:
+        """
+        同步地批量转换一页商品卡片，无法解析的卡片会被跳过。
+
+        :param items: 商品卡片列表。
+        :return: 成功解析的商品列表。
+        """
+        products = []
+        for item in items:
+            try:
+                products.append(self.create_product(item))
+            except Exception:
+                continue
+        return products
+
+    def create_product(self, item) -> SearchResultItem:
+        """
+        Create a product object from an item card synchronously.
+
+        Args:
+            item: The item card to process.
+
+        Returns:
+            SearchResultItem: The processed product.
+        """
+        product_id = self.get_item_id(item)
+        return SearchResultItem(
+            name=self.get_item_name(item),
+            price=self.get_item_price(item),
+            image_url=self.get_item_image_url(item, product_id),
+            product_url=self.get_item_product_url(item, product_id),
+            id=product_id,
+            site=self.get_item_site(item),
+            status=self.get_item_status(item),
+        )
+
+    async def create_product_from_card(self, item) -> SearchResultItem:
+        """
+        Create a product object from an item card, awaiting asynchronous getters.
+        Kept for subclasses that still implement get_item_* as coroutines.
+
+        Args:
+            item: The item card to process.
+
+        Returns:
+            SearchResultItem: The processed product.
+        """
+        name = await self.get_item_name(item=item)
+
+        product_id = await self.get_item_id(item=item)
+
+        product_url = await self.get_item_product_url(item=item, id=product_id)
+
+        image_url = await self.get_item_image_url(item=item, id=product_id)
+
+        price = await self.get_item_price(item=item)
+
+        site = await self.get_item_site(item=item)
+
+        status = await self.get_item_status(item=item)
+
+        return SearchResultItem(
+            name=name,
+            price=price,
+            image_url=image_url,
+            product_url=product_url,
+            id=product_id,
+            site=site,
+            status=status,
+        )
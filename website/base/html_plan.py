@@ -0,0 +1,53 @@
+import re
+from typing import Optional, Union
+
+from lxml import etree
+from parsel.csstranslator import HTMLTranslator
+
+_translator = HTMLTranslator()
+
+# 页面没有声明编码时 lxml 会按 latin-1 解码，此时改用 UTF-8
+_utf8_parser = etree.HTMLParser(encoding="utf-8")
+_meta_charset = re.compile(rb"<meta[^>]+charset", re.IGNORECASE)
+
+
+def css(query: str, xpath_suffix: str = "") -> etree.XPath:
+    """
+    在导入时把 CSS 选择器一次性转换并编译为 XPath，之后每个商品卡片直接复用，不再重复转换。
+
+    :param query: CSS 选择器，支持 parsel 的 ::text 和 ::attr() 伪元素。
+    :param xpath_suffix: 追加在转换结果后的 XPath 片段，例如 "/span[last()]/text()"。
+    :return: 编译好的 XPath，以传入的元素为上下文节点执行。
+    """
+    return etree.XPath(_translator.css_to_xpath(query) + xpath_suffix)
+
+
+def parse_html(
+    body: Union[bytes, str, etree._Element, None]
+) -> Optional[etree._Element]:
+    """
+    直接从响应的原始字节解析 HTML，由 lxml 根据页面声明的编码解码，省去先解码成文本再构造 Selector 的过程。
+
+    :param body: 响应体，已经解析过的根元素原样返回。
+    :return: 文档的根元素，响应为空时返回 None。
+    """
+    if isinstance(body, etree._Element):
+        return body
+    if not body:
+        return None
+    if isinstance(body, bytes) and not _meta_charset.search(body, 0, 4096):
+        return etree.HTML(body, _utf8_parser)
+    return etree.HTML(body)
+
+
+def first(xpath: etree.XPath, node) -> Optional[str]:
+    """
+    返回 XPath 的第一个文本结果。
+
+    :param xpath: 编译好的 XPath。
+    :param node: 上下文节点。
+    :return: 第一个结果，没有结果时返回 None。
+    """
+    result = xpath(node)
+    # 转换为普通字符串，避免结果继续引用整个文档树
+    return str(result[0]) if result else None
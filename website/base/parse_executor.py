@@ -0,0 +1,132 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .html_plan import parse_html
+from .search_result_item import SearchResultItem
+
+# 子进程返回的紧凑商品数据: (site, id, name, product_url, image_url, status, price)
+ProductRow = Tuple
+
+
+class ParseExecutor:
+    """
+    HTML 解析的进程池。
+
+    响应的原始字节被发送到子进程中解析，只把紧凑的商品元组传回事件循环，
+    解析的 CPU 开销不再阻塞其他关键词的定时器和消息推送。
+    进程池满载时，新的解析请求在事件循环中等待，而不是无限堆积在队列里。
+    """
+
+    def __init__(self, max_workers: int, max_pending: Optional[int] = None):
+        """
+        :param max_workers: 子进程数量。
+        :param max_pending: 同时提交到进程池的解析任务上限，默认为子进程数量的两倍。
+        """
+        self.max_workers = max_workers
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._slots = asyncio.Semaphore(max_pending or max_workers * 2)
+
+    @classmethod
+    def from_env(cls) -> Optional["ParseExecutor"]:
+        """
+        根据环境变量 PARSE_WORKERS 创建进程池：未设置或为 0 时不启用，auto 表示使用全部 CPU 核心。
+
+        :return: ParseExecutor 实例，未启用时返回 None。
+        """
+        value = os.getenv("PARSE_WORKERS", "0").strip().lower()
+        workers = (os.cpu_count() or 1) if value == "auto" else int(value or 0)
+        if workers <= 0:
+            return None
+        logger.info(f"HTML parsing offloaded to {workers} worker processes")
+        return cls(workers)
+
+    async def parse_page(self, scraper_cls, body) -> List[SearchResultItem]:
+        """
+        在子进程中解析一页响应。
+
+        :param scraper_cls: 爬虫类，必须实现同步的 select_cards。
+        :param body: 响应体。
+        :return: 解析出的商品列表。
+        """
+        async with self._slots:
+            rows = await asyncio.get_running_loop().run_in_executor(
+                self._executor, parse_page, scraper_cls, body
+            )
+        return [SearchResultItem(*row) for row in rows]
+
+    async def parse_first_page(
+        self, scraper_cls, body
+    ) -> Tuple[int, List[SearchResultItem]]:
+        """
+        在子进程中解析第一页响应，一次解析同时得到最大页数和商品。
+
+        :param scraper_cls: 爬虫类，必须实现同步的 select_cards 和 count_pages。
+        :param body: 响应体。
+        :return: (最大页数, 商品列表)。
+        """
+        async with self._slots:
+            max_pages, rows = await asyncio.get_running_loop().run_in_executor(
+                self._executor, parse_first_page, scraper_cls, body
+            )
+        return max_pages, [SearchResultItem(*row) for row in rows]
+
+    def shutdown(self):
+        """关闭进程池。"""
+        self._executor.shutdown(wait=False)
+
+
+# 子进程中每个爬虫类只创建一次实例，它们不需要 http_client
+_scrapers: Dict[type, object] = {}
+
+
+def _get_scraper(scraper_cls):
+    scraper = _scrapers.get(scraper_cls)
+    if scraper is None:
+        scraper = _scrapers[scraper_cls] = scraper_cls(None)
+    return scraper
+
+
+def parse_page(scraper_cls, body) -> List[ProductRow]:
+    """
+    在子进程中执行：解析一页响应并返回紧凑的商品元组。必须是模块级函数才能被 pickle。
+
+    :param scraper_cls: 爬虫类。
+    :param body: 响应体。
+    :return: 商品元组列表。
+    """
+    scraper = _get_scraper(scraper_cls)
+    return _to_rows(scraper, scraper.select_cards(body))
+
+
+def parse_first_page(scraper_cls, body) -> Tuple[int, List[ProductRow]]:
+    """
+    在子进程中执行：HTML 只解析一次，从同一棵文档树中读取最大页数和商品。
+
+    :param scraper_cls: 爬虫类。
+    :param body: 第一页的响应体。
+    :return: (最大页数, 商品元组列表)。
+    """
+    scraper = _get_scraper(scraper_cls)
+    root = parse_html(body)
+    if root is None:
+        return 0, []
+    return scraper.count_pages(root), _to_rows(scraper, scraper.select_cards(root))
+
+
+def _to_rows(scraper, cards) -> List[ProductRow]:
+    return [
+        (
+            product.site,
+            product.id,
+            product.name,
+            product.product_url,
+            product.image_url,
+            product.status,
+            product.price,
+        )
+        for product in scraper.extract_products(cards)
+    ]
@@ -2,11 +2,21 @@ from abc import ABC, abstractmethod
 from math import ceil
 from urllib import parse
 from .common_imports import *
+from .extraction import ProductExtractor
+from .parse_executor import ParseExecutor
+from .watermark import Watermark, search_state_key
 
 
-class BaseScrapy(ABC):
+class BaseScrapy(ProductExtractor, ABC):
     MAX_RETRIES = 3  # 最大重试次数
     RETRY_DELAY = 1  # 初始重试延迟（秒）
+    INCREMENTAL_CRAWL = False  # 搜索结果是否按上新时间倒序排列，可以增量抓取
+    PARSES_MAX_PAGES = False  # 是否实现了 parse_max_pages，第一页的响应可以同时用于最大页数和商品
+    RESPONSE_BYTES = False  # get_response 是否返回原始字节而不是解码后的文本
+    # 是否实现了同步的 select_cards（同时设置 PARSES_MAX_PAGES 时还需同步的 count_pages），可以在解析进程池中解析
+    OFFLOAD_PARSING = False
+    # 全局共享的 HTML 解析进程池，由 main.py 根据 PARSE_WORKERS 创建，未启用时为 None
+    parse_executor: Optional[ParseExecutor] = None
 
     def __init__(self, base_url, page_size, http_client, method, headers=None):
         self.base_url = base_url
@@ -14,6 +24,7 @@ class BaseScrapy(ABC):
         self.headers = headers if headers else {}
         self.http_client = http_client
         self.method = method
+        self.watermarks: Dict[str, Watermark] = {}  # 关键词和过滤条件 -> 增量抓取水位
 
     async def async_init(self):
         pass
@@ -21,8 +32,98 @@ class BaseScrapy(ABC):
     async def search(
         self, search_term, iteration_count, user_max_pages
     ) -> AsyncGenerator[SearchResultItem, None]:
-        # 获取最大页数
-        max_pages = await self.get_max_pages(search_term)
+        async for page_products in self.search_pages(
+            search_term, iteration_count, user_max_pages
+        ):
+            for product in page_products:
+                yield product
+
+    async def search_pages(
+        self, search_term, iteration_count, user_max_pages
+    ) -> AsyncGenerator[List[SearchResultItem], None]:
+        """
+        按页返回搜索结果。支持增量抓取的站点在两次全量抓取之间只请求有新变化的前几页。
+        """
+        watermark = None
+        if search_term["incremental_crawl"] and self.is_newest_first(search_term):
+            watermark = self.watermarks.setdefault(
+                search_state_key(search_term), Watermark()
+            )
+            if iteration_count != 0 and not watermark.needs_full_sweep(
+                search_term["full_sweep_interval"]
+            ):
+                async for page_products in self.search_incremental(
+                    search_term, watermark, user_max_pages
+                ):
+                    yield page_products
+                return
+
+        known = {}
+        async for page_products in self.search_all_pages(
+            search_term, iteration_count, user_max_pages
+        ):
+            if watermark is not None:
+                known.update(
+                    (product.id, (product.price, product.status))
+                    for product in page_products
+                )
+            yield page_products
+        # 只有完整结束的全量抓取才会更新水位
+        if watermark is not None:
+            watermark.replace(known)
+
+    def is_newest_first(self, search_term) -> bool:
+        """
+        判断搜索结果是否按上新时间倒序排列，只有这样的搜索才能增量抓取。
+        关键词为自定义 URL 时，子类可以根据其中的排序参数重写此方法。
+        """
+        return self.INCREMENTAL_CRAWL
+
+    async def search_incremental(
+        self, search_term, watermark: Watermark, user_max_pages
+    ) -> AsyncGenerator[List[SearchResultItem], None]:
+        """
+        增量抓取：从第一页开始按顺序请求，遇到商品全部已知且没有变化的页时停止翻页。
+        """
+        for page in range(1, user_max_pages + 1):
+            page_products = await self.fetch_products(search_term, page)
+            if not page_products:
+                break
+            known_page = watermark.is_known_page(page_products)
+            watermark.update(page_products)
+            yield page_products
+            if known_page:
+                logger.debug(f"Incremental crawl stopped at page {page}")
+                break
+
+    async def search_all_pages(
+        self, search_term, iteration_count, user_max_pages
+    ) -> AsyncGenerator[List[SearchResultItem], None]:
+        """
+        全量抓取：并发请求所有页，哪一页先完成就先返回哪一页，慢页不会拖住已经完成的页。
+        """
+        # 获取最大页数，支持的站点直接复用第一页的响应，不再重复请求第一页
+        first_response = None
+        first_products = None
+        if self.PARSES_MAX_PAGES:
+            first_response = await self.get_response(search_term, 1)
+            if first_response is None:
+                logger.error("Failed to get response for page 1")
+                return
+            if (
+                self.OFFLOAD_PARSING
+                and self.parse_executor is not None
+                and hasattr(self, "count_pages")
+            ):
+                # 最大页数和第一页的商品在子进程中一次解析完成
+                max_pages, first_products = await self.parse_executor.parse_first_page(
+                    type(self), first_response
+                )
+            else:
+                # 未启用解析进程池，或站点没有实现同步的 count_pages 时，在事件循环中解析最大页数
+                max_pages = await self.parse_max_pages(first_response)
+        else:
+            max_pages = await self.get_max_pages(search_term)
 
         # 限制最大页数
         if iteration_count != 0:
@@ -41,21 +142,32 @@ class BaseScrapy(ABC):
             async with semaphore:
                 return await self.fetch_products(search_term, page)
 
-        tasks = [fetch_with_semaphore(page) for page in range(1, max_pages + 1)]
-        pages_content = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 遍历每一页的结果
-        for page_products in pages_content:
-            # 处理或记录异常 跳过空列表
-            if (
-                isinstance(page_products, (Exception, BaseException))
-                or not page_products
-            ):
-                # 处理异常或空结果
-                continue
-            # 迭代返回该页的商品信息
-            for product in page_products:
-                yield product
+        first_page = 1
+        tasks = []
+        if first_products is None and first_response is not None:
+            tasks.append(asyncio.ensure_future(self.parse_products(first_response)))
+        if first_response is not None:
+            first_page = 2
+        tasks.extend(
+            asyncio.ensure_future(fetch_with_semaphore(page))
+            for page in range(first_page, max_pages + 1)
+        )
+        try:
+            # 已经解析好的第一页在其余页请求发出后立即返回
+            if first_products:
+                yield first_products
+            for next_page in asyncio.as_completed(tasks):
+                try:
+                    page_products = await next_page
+                except Exception:
+                    continue  # 跳过失败的页
+                # 跳过空列表
+                if page_products:
+                    yield page_products
+        finally:
+            # 调用方提前停止迭代时取消尚未完成的页
+            for task in tasks:
+                task.cancel()
 
     # 搜索具体页数里的内容
     async def fetch_products(self, search_term, page: int) -> List[SearchResultItem]:
@@ -65,25 +177,25 @@ class BaseScrapy(ABC):
             logger.error(f"Failed to get response for page {page}'")
             return []
 
+        return await self.parse_products(response_text)
+
+    async def parse_products(self, response_text) -> List[SearchResultItem]:
+        # 启用解析进程池时，把响应交给子进程解析，事件循环只接收商品数据
+        if self.OFFLOAD_PARSING and self.parse_executor is not None:
+            return await self.parse_executor.parse_page(type(self), response_text)
+
         # 获取商品信息，json格式或者Selecter
         items = await self.get_response_items(response_text)
         # logger.info(f"Got {len(items)} items on page {page}")
 
-        # 如果商品列表为空，则直接返回
-        if not items:
-            return []  # 如果没有项目，直接退出函数
-
-        tasks = [self.create_product_from_card(item) for item in items]  # type: ignore
-        products = await asyncio.gather(*tasks, return_exceptions=True)
-        return [
-            product for product in products if isinstance(product, SearchResultItem)
-        ]
+        # 一整页商品在一次同步调用中完成转换
+        return await self.parse_items(items)
 
     # 请求链接和参数，可在子类中重写
     async def create_request_url(self, params):
         return self.base_url, params
 
-    async def get_response(self, search_term, page: int) -> Optional[str]:
+    async def get_response(self, search_term, page: int) -> Optional[Union[str, bytes]]:
         try:
             if self.method.upper() == "GET":
                 params = await self.create_search_params(search_term, page)
@@ -99,7 +211,9 @@ class BaseScrapy(ABC):
             else:
                 raise ValueError("Unsupported HTTP method")
             response.raise_for_status()
-            response_text = await response.text()
+            response_text = (
+                await response.content() if self.RESPONSE_BYTES else await response.text()
+            )
             await response.close()
             return response_text
         except Exception as e:
@@ -107,40 +221,6 @@ class BaseScrapy(ABC):
 
         return None
 
-    async def create_product_from_card(self, item) -> SearchResultItem:
-        """
-        Create a product object from an item card.
-
-        Args:
-            item: The item card to process.
-
-        Returns:
-            SearchResultItem: The processed product.
-        """
-        name = await self.get_item_name(item=item)
-
-        product_id = await self.get_item_id(item=item)
-
-        product_url = await self.get_item_product_url(item=item, id=product_id)
-
-        image_url = await self.get_item_image_url(item=item, id=product_id)
-
-        price = await self.get_item_price(item=item)
-
-        site = await self.get_item_site(item=item)
-
-        status = await self.get_item_status(item=item)
-
-        return SearchResultItem(
-            name=name,
-            price=price,
-            image_url=image_url,
-            product_url=product_url,
-            id=product_id,
-            site=site,
-            status=status,
-        )
-
     async def extract_number_from_content(
         self, hit_number: str, page_size: int
     ) -> Optional[int]:
@@ -154,6 +234,12 @@ class BaseScrapy(ABC):
         Returns:
             Optional[int]: The total number of pages or None if no number is found.
         """
+        return self.count_pages_in_text(hit_number, page_size)
+
+    def count_pages_in_text(self, hit_number: str, page_size: int) -> int:
+        """
+        extract_number_from_content 的同步版本，供在解析进程池中执行的 count_pages 使用。
+        """
         try:
             match = re.search(r"\d+", hit_number.replace(",", ""))
             number = int(match.group()) if match else 0
@@ -197,8 +283,15 @@ class BaseScrapy(ABC):
     async def create_search_params(self, search, page: int) -> dict:
         pass
 
-    @abstractmethod
     async def get_max_pages(self, search) -> int:
+        response = await self.get_response(search, 1)
+        return await self.parse_max_pages(response)
+
+    @abstractmethod
+    async def parse_max_pages(self, response) -> int:
+        """
+        从第一页的响应中解析最大页数。将 PARSES_MAX_PAGES 设为 True 的子类在全量抓取时复用第一页的响应。
+        """
         pass
 
     @abstractmethod
@@ -206,31 +299,31 @@ class BaseScrapy(ABC):
         pass
 
     @abstractmethod
-    async def get_item_site(self, item) -> str:
+    def get_item_site(self, item) -> str:
         pass
 
     @abstractmethod
-    async def get_item_id(self, item) -> str:
+    def get_item_id(self, item) -> str:
         pass
 
     @abstractmethod
-    async def get_item_name(self, item) -> str:
+    def get_item_name(self, item) -> str:
         pass
 
     @abstractmethod
-    async def get_item_price(self, item) -> float:
+    def get_item_price(self, item) -> float:
         pass
 
     @abstractmethod
-    async def get_item_product_url(self, item, id) -> str:
+    def get_item_product_url(self, item, id) -> str:
         pass
 
     @abstractmethod
-    async def get_item_image_url(self, item, id) -> str:
+    def get_item_image_url(self, item, id) -> str:
         pass
 
     @abstractmethod
-    async def get_item_status(self, item) -> int:
+    def get_item_status(self, item) -> int:
         pass
 
     def create_data(self, search, page):
@@ -1,10 +1,11 @@
 from abc import ABC, abstractmethod
 from uuid import uuid4
 
-import ecdsa
-from common.utils.jwt import generate_dpop
+from common.utils.jwt import DPoPKeyPool
+from common.utils.url_codec import mercari_image_url, mercari_product_url
 
 from .common_imports import *
+from .extraction import ProductExtractor
 
 
 class MercariSearchStatus:
@@ -36,12 +37,16 @@ class MercariItemStatus:
     ITEM_STATUS_ADMIN_CANCEL = "ITEM_STATUS_ADMIN_CANCEL"
 
 
-class BaseSearch(ABC):
+class BaseSearch(ProductExtractor, ABC):
+    # 是否在线程池中生成 DPoP 签名，避免 ECDSA 计算占用事件循环
+    SIGN_DPOP_IN_THREAD = False
 
     def __init__(self, root_url, http_client, page_size=120):
         self.page_size = page_size
         self.root_url = root_url
         self.http_client = http_client
+        # DPoP 签名密钥在请求之间轮换复用
+        self.dpop_keys = DPoPKeyPool()
 
     async def async_init(self):
         pass
@@ -53,7 +58,12 @@ class BaseSearch(ABC):
         pass  # 由子类实现
 
     async def get_response(self, method, data=None, params=None):
-        headers = self.create_headers(method.upper())
+        dpop = None
+        if self.SIGN_DPOP_IN_THREAD:
+            dpop = await self.dpop_keys.sign_async(
+                self.root_url, method.upper(), {"uuid": str(uuid4())}
+            )
+        headers = self.create_headers(method.upper(), dpop)
         try:
             if method.lower() == "post":
                 response = await self.http_client.post(
@@ -70,10 +80,10 @@ class BaseSearch(ABC):
         except Exception as e:
             logger.error(f"遇到错误：{e}")
 
-    def create_headers(self, method):
+    def create_headers(self, method, dpop=None):
         # ... 实现创建请求头的逻辑
         headers = {
-            "DPoP": self.create_headers_dpop(method),
+            "DPoP": dpop or self.create_headers_dpop(method),
             "X-Platform": "web",  # mercari requires this header
             "Accept": "application/json, text/plain, */*",
             "Accept-Encoding": "gzip, deflate, br",
@@ -87,83 +97,28 @@ class BaseSearch(ABC):
         return headers
 
     def create_headers_dpop(self, method):
-        dpop = generate_dpop(
-            url=self.root_url,
-            method=method,
-            key=ecdsa.SigningKey.generate(ecdsa.NIST256p),
-            extra_payload={"uuid": str(uuid4())},
-        )
-        return dpop
+        return self.dpop_keys.sign(self.root_url, method, {"uuid": str(uuid4())})
 
-    async def create_product_from_card(self, item) -> SearchResultItem:
-        """
-        Create a product object from an item card.
-
-        Args:
-            item: The item card to process.
-
-        Returns:
-            SearchResultItem: The processed product.
-        """
-        name = await self.get_item_name(item=item)
-
-        product_id = await self.get_item_id(item=item)
-
-        product_url = await self.get_item_product_url(item=item, id=product_id)
-
-        image_url = await self.get_item_image_url(item=item, id=product_id)
-
-        price = await self.get_item_price(item=item)
-
-        site = await self.get_item_site(item = item)
-
-        status = await self.get_item_status(item=item)
-
-        return SearchResultItem(
-            name=name,
-            price=price,
-            image_url=image_url,
-            product_url=product_url,
-            id=product_id,
-            site=site,
-            status=status,
-        )
-
-    async def get_item_id(self, item):
+    def get_item_id(self, item):
         return item["id"]
 
-    async def get_item_name(self, item):
+    def get_item_name(self, item):
         return item["name"]
 
-    async def get_item_price(self, item):
+    def get_item_price(self, item):
         return item["price"]
 
-    async def get_item_product_url(self, item, id):
-        if id[0] == "m" and id[1:].isdigit():
-            product_url = "https://jp.mercari.com/item/{}".format(id)
-        else:
-            product_url = "https://mercari-shops.com/products/{}".format(id)
-        return product_url
-
-    async def get_item_image_url(self, item, id):
-        image_type = "image"
-        if id[0] == "m" and id[1:].isdigit():
-            if image_type == "image":
-                # image_url = "https://static.mercdn.net/item/detail/orig/photos/{}_1.jpg".format(id)
-                image_url = "https://static.mercdn.net/c!/w=360,f=webp/item/detail/orig/photos/{}_1.jpg".format(
-                    id
-                )
-            else:
-                # image_url = "https://static.mercdn.net/thumb/photos/{}_1.jpg".format(id)
-                image_url = item["thumbnails"][0]
-        else:
-            image_url = item["thumbnails"][0]
-        return image_url
+    def get_item_product_url(self, item, id):
+        return mercari_product_url(id)
+
+    def get_item_image_url(self, item, id):
+        # 个人卖家的图片地址可由 ID 推导，煤炉 Shops 的图片地址只能从 thumbnails 中获取
+        return mercari_image_url(id) or item["thumbnails"][0]
 
     @abstractmethod
-    async def get_item_site(self, item) -> str:
+    def get_item_site(self, item) -> str:
         pass
 
     @abstractmethod
-    async def get_item_status(self, item) -> int:
+    def get_item_status(self, item) -> int:
         pass
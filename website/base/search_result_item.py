@@ -1,4 +1,22 @@
+import sys
+
+from common.utils.url_codec import get_url_codec
+
+
 class SearchResultItem:
+    # 首轮抓取时会同时存在数万个实例，使用 __slots__ 去掉每个实例的 __dict__
+    __slots__ = (
+        "site",
+        "id",
+        "name",
+        "price",
+        "price_change",
+        "pre_price",
+        "_product_url",
+        "_image_url",
+        "status",
+    )
+
     def __init__(
         self,
         site: str,
@@ -7,20 +25,38 @@ class SearchResultItem:
         product_url: str,
         image_url: str,
         status: int,
-        price: float,
+        price: int,
         price_change: int = 0,
         pre_price=None,
     ):
-        self.site = site
+        self.site = sys.intern(site)  # 所有商品共享同一个站点名字符串
         self.id = id
         self.name = name
-        self.price = float(price) if price else 0
+        self.price = int(float(price)) if price else 0  # 价格以整数日元保存
         self.price_change = price_change
         self.pre_price = pre_price
-        self.product_url = product_url
-        self.image_url = image_url
+        # 能由商品 ID 推导出的 URL 不保存，读取时再重建
+        codec = get_url_codec(site)
+        self._product_url = codec.encode("product_url", id, product_url)
+        self._image_url = codec.encode("image_url", id, image_url)
         self.status = status
 
+    @property
+    def product_url(self):
+        return get_url_codec(self.site).decode("product_url", self.id, self._product_url)
+
+    @product_url.setter
+    def product_url(self, value):
+        self._product_url = get_url_codec(self.site).encode("product_url", self.id, value)
+
+    @property
+    def image_url(self):
+        return get_url_codec(self.site).decode("image_url", self.id, self._image_url)
+
+    @image_url.setter
+    def image_url(self, value):
+        self._image_url = get_url_codec(self.site).encode("image_url", self.id, value)
+
     def __hash__(self):
         return hash(self.id)
 
@@ -0,0 +1,60 @@
+import json
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from .search_result_item import SearchResultItem
+
+
+def search_state_key(search_term) -> str:
+    """
+    增量抓取状态的键。关键词相同但过滤条件不同的搜索结果不同，需要各自的水位。
+
+    :param search_term: 搜索配置。
+    :return: 由关键词和过滤条件组成的键。
+    """
+    return json.dumps(
+        [search_term["keyword"], search_term["filter"]],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+class Watermark:
+    """
+    按上新时间倒序排列的站点中，单个搜索的增量抓取水位。
+
+    记录上一次抓取时看到的商品及其 (price, status)。增量抓取时从第一页开始逐页请求，
+    一旦某一页的商品全部已知且没有变化，说明之后的页都是旧商品，就停止翻页；
+    更深处的价格变化由定期的全量抓取发现。
+    """
+
+    def __init__(self):
+        self.known: Dict[str, Tuple[float, Optional[int]]] = {}
+        self.last_full_sweep = 0.0
+
+    def needs_full_sweep(self, interval: float) -> bool:
+        """
+        判断是否需要进行全量抓取。
+
+        :param interval: 全量抓取的间隔（秒），0 表示每一轮都全量抓取。
+        :return: 距离上一次全量抓取超过间隔时返回 True。
+        """
+        return interval <= 0 or time.time() - self.last_full_sweep >= interval
+
+    def is_known_page(self, products: Iterable[SearchResultItem]) -> bool:
+        """
+        判断一页商品是否全部已知且价格和状态都没有变化。
+        """
+        known = self.known
+        return all(known.get(product.id) == (product.price, product.status) for product in products)
+
+    def update(self, products: Iterable[SearchResultItem]):
+        """记录增量抓取中看到的商品。"""
+        for product in products:
+            self.known[product.id] = (product.price, product.status)
+
+    def replace(self, known: Dict[str, Tuple[float, Optional[int]]]):
+        """用一次完整的全量抓取结果替换已知商品，并记录全量抓取的时间。"""
+        self.known = known
+        self.last_full_sweep = time.time()
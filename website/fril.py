@@ -1,10 +1,24 @@
-from parsel import Selector
+from lxml import etree
 
+from .base.html_plan import css, first, parse_html
 from .base.scraper import BaseScrapy
 import re
 
+# 预编译的选择器
+PAGE_COUNT = css("div.col-sm-12.col-xs-3.page-count.text-right::text")
+CARDS = css(".item-box")
+LINK = css(".item-box__image-wrapper a::attr(href)")
+NAME = css(".item-box__item-name span::text")
+PRICE = css(".item-box__item-price", "/span[last()]/text()")
+IMAGE = css(".item-box__image-wrapper a img::attr(data-original)")
+SOLDOUT = css(".item-box__soldout_ribbon")
+
 
 class Fril(BaseScrapy):
+    INCREMENTAL_CRAWL = True  # 按上新时间倒序排列
+    PARSES_MAX_PAGES = True  # 最大页数与商品在同一个响应中
+    RESPONSE_BYTES = True  # 由 lxml 直接解析响应字节
+    OFFLOAD_PARSING = True  # 可以在解析进程池中解析
 
     def __init__(self, http_client):
         headers = {
@@ -38,54 +52,59 @@ class Fril(BaseScrapy):
 
         return params
 
-    async def get_max_pages(self, search) -> int:
-        res = await self.get_response(search, 1)
-        selector = Selector(res)
-        hit_text = selector.css(
-            "div.col-sm-12.col-xs-3.page-count.text-right::text"
-        ).get()
+    def is_newest_first(self, search_term) -> bool:
+        if "https" not in search_term["keyword"]:
+            return True
+        sort = self.get_param_value(search_term["keyword"], "sort") or "created_at"
+        order = self.get_param_value(search_term["keyword"], "order") or "desc"
+        return sort == "created_at" and order == "desc"
+
+    async def parse_max_pages(self, res) -> int:
+        return self.count_pages(parse_html(res))
+
+    def count_pages(self, root) -> int:
+        hit_text = first(PAGE_COUNT, root) if root is not None else None
 
         # 确保 hit_text 不是 None
         if hit_text:
             match = re.search(r"約(.+)件中", hit_text)
             if match:
                 hit_number = match.group(1).replace(",", "")
-                max_pages = await self.extract_number_from_content(
-                    hit_number, self.page_size
-                )
+                max_pages = self.count_pages_in_text(hit_number, self.page_size)
                 return min(max_pages, 100) if max_pages else 100
         return 0
 
     async def get_response_items(self, response):
-        selector = Selector(response)
-        return selector.css(".item-box") if selector else []
+        return self.select_cards(response)
 
-    async def get_item_id(self, item: Selector):
-        product_url = item.css(".item-box__image-wrapper a::attr(href)").get()
+    def select_cards(self, response):
+        root = parse_html(response)
+        return CARDS(root) if root is not None else []
+
+    def get_item_id(self, item: etree._Element):
+        product_url = first(LINK, item)
         if product_url:
             match = re.search("fril.jp/([0-9a-z]+)", product_url)
             if match:
                 return match.group(1)
         return None
 
-    async def get_item_name(self, item: Selector):
-        return item.css(".item-box__item-name span::text").get()
+    def get_item_name(self, item: etree._Element):
+        return first(NAME, item)
 
-    async def get_item_price(self, item: Selector):
-        price_text = (
-            item.css(".item-box__item-price").xpath("./span[last()]/text()").get()
-        )
+    def get_item_price(self, item: etree._Element):
+        price_text = first(PRICE, item)
         return float(re.sub(r"[^\d]", "", price_text)) if price_text else 0
 
-    async def get_item_image_url(self, item: Selector, id: str):
+    def get_item_image_url(self, item: etree._Element, id: str):
         # image_url = re.sub(r"\?.*$", "", image_url_with_query)
-        return item.css(".item-box__image-wrapper a img::attr(data-original)").get()
+        return first(IMAGE, item)
 
-    async def get_item_product_url(self, item: Selector, id: str):
-        return item.css(".item-box__image-wrapper a::attr(href)").get()
+    def get_item_product_url(self, item: etree._Element, id: str):
+        return first(LINK, item)
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         return "fril"
 
-    async def get_item_status(self, item):
-        return 0 if item.css(".item-box__soldout_ribbon") else 1
+    def get_item_status(self, item):
+        return 0 if SOLDOUT(item) else 1
@@ -3,6 +3,8 @@ from .base.scraper import BaseScrapy
 
 
 class HoYoYo(BaseScrapy):
+    PARSES_MAX_PAGES = True  # 最大页数与商品在同一个响应中
+
     def __init__(self, http_client):
         headers = {
             "x-requested-with": "XMLHttpRequest",
@@ -28,8 +30,7 @@ class HoYoYo(BaseScrapy):
         search_url = search["keyword"]
         return f"{search_url}&page={page}"
 
-    async def get_max_pages(self, search) -> int:
-        response = await self.get_response(search, 1)
+    async def parse_max_pages(self, response) -> int:
         data = json.loads(response) if response else {}
         return data.get("meta", {}).get("pager", {}).get("total_page", 0)
 
@@ -37,23 +38,23 @@ class HoYoYo(BaseScrapy):
         data = json.loads(response) if response else {}
         return data.get("goods", [])
 
-    async def get_item_id(self, item):
+    def get_item_id(self, item):
         return item.get("id")
 
-    async def get_item_name(self, item):
+    def get_item_name(self, item):
         return item.get("name")
 
-    async def get_item_price(self, item):
+    def get_item_price(self, item):
         return item.get("price")
 
-    async def get_item_image_url(self, item, id):
+    def get_item_image_url(self, item, id):
         return item.get("image")
 
-    async def get_item_product_url(self, item, id):
+    def get_item_product_url(self, item, id):
         return item.get("origin_url")
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         return "hoyoyo"
 
-    async def get_item_status(self, item):
+    def get_item_status(self, item):
         return 1 if item.get("sale_out") == "0" else 0
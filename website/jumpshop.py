@@ -1,9 +1,21 @@
-from parsel import Selector
-
+from .base.html_plan import css, first, parse_html
 from .base.scraper import BaseScrapy
 
+# 预编译的选择器
+TITLE = css('meta[property="og:title"]::attr(content)')
+CARDS = css("div.card-wrapper")
+LINK = css("a.full-unstyled-link::attr(href)")
+NAME = css("span.card-information__text::text")
+PRICE = css("span.price-item--sale::text")
+IMAGE = css("img::attr(src)")
+SOLD_OUT = css("div.price.price--sold-out")
+
 
 class JumpShop(BaseScrapy):
+    INCREMENTAL_CRAWL = True  # 按上新时间倒序排列
+    RESPONSE_BYTES = True  # 由 lxml 直接解析响应字节
+    OFFLOAD_PARSING = True  # 可以在解析进程池中解析
+    PARSES_MAX_PAGES = True  # 最大页数与商品在同一个响应中
 
     def __init__(self, http_client):
         headers = {
@@ -37,40 +49,44 @@ class JumpShop(BaseScrapy):
             "options[prefix]": "last",
         }
 
-    async def get_max_pages(self, search) -> int:
-        res = await self.get_response(search, 1)
-        selector = Selector(res)
-        content = selector.css('meta[property="og:title"]').attrib.get("content", "")
+    async def parse_max_pages(self, res) -> int:
+        return self.count_pages(parse_html(res))
 
-        max_pages = await self.extract_number_from_content(content, self.page_size)
+    def count_pages(self, root) -> int:
+        content = (first(TITLE, root) if root is not None else None) or ""
+
+        max_pages = self.count_pages_in_text(content, self.page_size)
         return max_pages or 0
 
     async def get_response_items(self, response):
-        selector = Selector(response)
-        return selector.css("div.card-wrapper") if selector else []
+        return self.select_cards(response)
+
+    def select_cards(self, response):
+        root = parse_html(response)
+        return CARDS(root) if root is not None else []
 
-    async def get_item_id(self, item):
-        product_url = item.css("a.full-unstyled-link::attr(href)").get()
+    def get_item_id(self, item):
+        product_url = first(LINK, item)
         return product_url.split("/products/")[1].split("?")[0] if product_url else None
 
-    async def get_item_name(self, item):
-        return item.css("span.card-information__text::text").get().strip()
+    def get_item_name(self, item):
+        return first(NAME, item).strip()
 
-    async def get_item_price(self, item):
-        price_text = item.css("span.price-item--sale::text").get().strip()
+    def get_item_price(self, item):
+        price_text = first(PRICE, item).strip()
         return float(price_text[1:].replace(",", "")) if price_text else 0
 
-    async def get_item_image_url(self, item, id):
-        image_url = item.css("img::attr(src)").get()
+    def get_item_image_url(self, item, id):
+        image_url = first(IMAGE, item)
         return f"https:{image_url}" if image_url else None
 
-    async def get_item_product_url(self, item, id):
-        product_link = item.css("a.full-unstyled-link::attr(href)").get()
+    def get_item_product_url(self, item, id):
+        product_link = first(LINK, item)
         return f"https://jumpshop-online.com{product_link}" if product_link else None
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         return "jumpshop"
 
-    async def get_item_status(self, item):
-        sold_out = item.css("div.price.price--sold-out")
+    def get_item_status(self, item):
+        sold_out = SOLD_OUT(item)
         return 0 if sold_out else 1
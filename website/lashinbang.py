@@ -3,6 +3,8 @@ from .base.scraper import BaseScrapy
 
 
 class Lashinbang(BaseScrapy):
+    PARSES_MAX_PAGES = True  # 最大页数与商品在同一个响应中
+
     def __init__(self, http_client):
         headers = {
             "Cache-Control": "no-cache",
@@ -32,8 +34,7 @@ class Lashinbang(BaseScrapy):
             "controller": "lashinbang_front",
         }
 
-    async def get_max_pages(self, search) -> int:
-        res = await self.get_response(search, 1)
+    async def parse_max_pages(self, res) -> int:
         match = re.search(r"{.*}", res, re.DOTALL) if res else None
         json_data = match.group() if match else "{}"
         data = json.loads(json_data)
@@ -50,26 +51,26 @@ class Lashinbang(BaseScrapy):
         data = json.loads(json_data)
         return data.get("kotohaco", {}).get("result", {}).get("items", [])
 
-    async def get_item_id(self, item):
+    def get_item_id(self, item):
         return item.get("itemid")
 
-    async def get_item_name(self, item):
+    def get_item_name(self, item):
         return item.get("title")
 
-    async def get_item_price(self, item):
+    def get_item_price(self, item):
         return item.get("price")
 
-    async def get_item_image_url(self, item, id):
+    def get_item_image_url(self, item, id):
         image = item.get("image")
         if image == "https://img.lashinbang.com/":
             image = image + item.get("narrow14")
         return image
 
-    async def get_item_product_url(self, item, id):
+    def get_item_product_url(self, item, id):
         return item.get("url")
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         return "lashinbang"
 
-    async def get_item_status(self, item):
+    def get_item_status(self, item):
         return item.get("number6")
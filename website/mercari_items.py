@@ -1,56 +1,82 @@
 from .base.scraper_mercari import BaseSearch
 from .base.search_result_item import SearchResultItem
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List, Optional
+import asyncio
+
+
+class PagerCursor:
+    """Mercari 卖家商品列表的 keyset 翻页位置：上一页最后一个商品的 pager_id，下一页从它之后开始。"""
+
+    __slots__ = ("has_next", "pager_id")
+
+    def __init__(self):
+        self.has_next = True
+        self.pager_id = ""
+
+    def advance(self, response: Optional[dict]):
+        """根据一页的响应移动到下一页。"""
+        data = response.get("data", []) if response else []
+        self.has_next = bool(data) and response.get("meta", {}).get("has_next", False)
+        if self.has_next:
+            self.pager_id = data[-1].get("pager_id", "")
 
 
 class MercariItems(BaseSearch):
 
     def __init__(self, http_client):
         super().__init__("https://api.mercari.jp/items/get_items", http_client)
-        self.has_next = True
-        self.pager_id = ""
 
     async def search(
         self, search, iteration_count, user_max_pages
     ) -> AsyncGenerator[SearchResultItem, None]:
-        self.has_next = True
-        self.pager_id = ""
-        while self.has_next:
-            async for item in self.fetch_products(search):
-                yield item
+        async for page_products in self.search_pages(
+            search, iteration_count, user_max_pages
+        ):
+            for product in page_products:
+                yield product
 
-    async def fetch_products(self, search) -> AsyncGenerator[SearchResultItem, None]:
-        params = self.create_params(search)
-        response = await self.get_response("GET", params=params)
-
-        if not response:
-            self.has_next = False  # 将 has_next 设置为 False 以停止进一步的迭代
-            return  # 当没有下一页时直接返回，以结束函数执行
-
-        for item in response.get("data", []):
-            searched_item = await self.create_product_from_card(item)
-            yield searched_item
+    async def search_pages(
+        self, search, iteration_count, user_max_pages
+    ) -> AsyncGenerator[List[SearchResultItem], None]:
+        """
+        按页返回卖家的商品。拿到一页响应后立即根据最后一个 pager_id 发出下一页的请求，
+        再解析并返回当前页，请求与解析、入库重叠进行。
+        """
+        cursor = PagerCursor()
+        next_response = asyncio.ensure_future(self.fetch_page(search, cursor))
+        try:
+            while next_response is not None:
+                response = await next_response
+                next_response = None
+                cursor.advance(response)
+                if cursor.has_next:
+                    next_response = asyncio.ensure_future(self.fetch_page(search, cursor))
+                if response:
+                    yield await self.parse_items(response.get("data", []))
+        finally:
+            if next_response is not None:
+                next_response.cancel()
 
-        self.has_next = response.get("meta", {}).get("has_next", False)
-        if self.has_next:
-            self.pager_id = response["data"][-1].get("pager_id", "")
+    def fetch_page(self, search, cursor: PagerCursor):
+        # 请求参数在发出请求时立即确定，之后移动游标不会影响已发出的请求
+        return self.get_response("GET", params=self.create_params(search, cursor))
 
-    def create_params(self, search):
+    def create_params(self, search, cursor: PagerCursor):
         params = {
             "seller_id": search["keyword"],
             "limit": 150,
             # "status": "on_sale,trading,sold_out",
             "status": getattr(search["filter"], "status", "on_sale, trading"),
         }
-        # 仅当 self.pager_id 非空时才添加 max_pager_id 参数
-        if self.pager_id:
-            params["max_pager_id"] = self.pager_id
+        # 仅当 pager_id 非空时才添加 max_pager_id 参数
+        if cursor.pager_id:
+            params["max_pager_id"] = cursor.pager_id
 
         return params
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         return "mercari_user"
 
-    async def get_item_status(self, item):
+    def get_item_status(self, item):
         status = 1 if item.get("status") == "on_sale" else 0
-        return status
\ No newline at end of file
+        return status
@@ -1,6 +1,9 @@
 from .base.scraper_mercari import BaseSearch
 from .base.common_imports import *
+from .base.watermark import Watermark, search_state_key
 
+import time
+from typing import Tuple
 from uuid import uuid4
 
 
@@ -8,28 +11,114 @@ class MercariSearch(BaseSearch):
 
     def __init__(self, http_client):
         super().__init__("https://api.mercari.jp/v2/entities:search", http_client)
+        # 搜索条件 -> 按上新时间排序的增量抓取水位
+        self.watermarks: Dict[str, Watermark] = {}
+        # 搜索条件 -> 上一次按推荐排序抓取的时间
+        self.score_sweeps: Dict[str, float] = {}
 
     async def search(
         self, search, iteration_count, user_max_pages
     ) -> AsyncGenerator[SearchResultItem, None]:
+        async for page_products in self.search_pages(
+            search, iteration_count, user_max_pages
+        ):
+            for product in page_products:
+                yield product
+
+    async def search_pages(
+        self, search, iteration_count, user_max_pages
+    ) -> AsyncGenerator[List[SearchResultItem], None]:
+        """
+        按页返回两种排序的搜索结果，哪一页先完成就先返回哪一页。
+        开启增量抓取时，两次全量抓取之间只按上新时间逐页翻页，遇到商品全部已知的页就停止，
+        推荐排序只按 score_sweep_interval 的间隔抓取。
+        """
+        watermark = None
+        if search["incremental_crawl"]:
+            state_key = search_state_key(search)
+            watermark = self.watermarks.setdefault(state_key, Watermark())
+            if iteration_count != 0 and not watermark.needs_full_sweep(
+                search["full_sweep_interval"]
+            ):
+                async for page_products in self.search_incremental(
+                    search, watermark, user_max_pages
+                ):
+                    yield page_products
+                if self.score_sweep_due(search, state_key):
+                    async for page_products in self.search_sorts(
+                        search, (("SORT_SCORE", 3),)
+                    ):
+                        yield page_products
+                    self.score_sweeps[state_key] = time.time()
+                return
+
         score_page, created_time_page = (
             (100, 100) if iteration_count == 0 else (3, user_max_pages)
         )
-        tasks = [
-            self.search_with_sort(search, "SORT_SCORE", score_page),
-            self.search_with_sort(search, "SORT_CREATED_TIME", created_time_page),
-        ]
-        all_products = await asyncio.gather(*tasks, return_exceptions=True)
-
-        for products in all_products:
-            if isinstance(products, (Exception, BaseException)):
-                continue
-            for product in products:
-                yield product
-
-    async def search_with_sort(
-        self, search, sort_type, max_pages
-    ) -> List[SearchResultItem]:
+        known = {}
+        async for page_products in self.search_sorts(
+            search,
+            (("SORT_CREATED_TIME", created_time_page), ("SORT_SCORE", score_page)),
+        ):
+            if watermark is not None:
+                known.update(
+                    (product.id, (product.price, product.status))
+                    for product in page_products
+                )
+            yield page_products
+        # 只有完整结束的全量抓取才会更新水位
+        if watermark is not None:
+            watermark.replace(known)
+            self.score_sweeps[state_key] = time.time()
+
+    async def search_sorts(
+        self, search, sorts
+    ) -> AsyncGenerator[List[SearchResultItem], None]:
+        """
+        并发请求各排序的前若干页，哪一页先完成就先返回哪一页。
+
+        :param sorts: (排序方式, 页数) 列表。
+        """
+        tasks = []
+        for sort_type, max_pages in sorts:
+            tasks.extend(self.create_sort_tasks(search, sort_type, max_pages))
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                page_products = await next_page
+                if page_products:
+                    yield page_products
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def search_incremental(
+        self, search, watermark: Watermark, user_max_pages
+    ) -> AsyncGenerator[List[SearchResultItem], None]:
+        """
+        增量抓取：按上新时间排序，沿着响应中的 nextPageToken 逐页请求，遇到商品全部已知且没有变化的页时停止翻页。
+        """
+        page_token = "v1:0"
+        for page in range(user_max_pages):
+            page_products, page_token = await self.fetch_page(
+                search, page_token, "SORT_CREATED_TIME"
+            )
+            if not page_products:
+                break
+            known_page = watermark.is_known_page(page_products)
+            watermark.update(page_products)
+            yield page_products
+            if known_page or not page_token:
+                logger.debug(f"Incremental crawl stopped at page {page + 1}")
+                break
+
+    def score_sweep_due(self, search, state_key) -> bool:
+        """
+        判断是否需要按推荐排序抓取，用于在增量抓取之间发现价格变化和补货。
+        """
+        interval = search["score_sweep_interval"]
+        return interval <= 0 or time.time() - self.score_sweeps.get(state_key, 0) >= interval
+
+    def create_sort_tasks(self, search, sort_type, max_pages) -> List[asyncio.Task]:
         async def fetch_with_semaphore(page):
             async with semaphore:
                 return await self.fetch_products(search, page, sort_type)
@@ -37,48 +126,48 @@ class MercariSearch(BaseSearch):
         # 限制最大页数
         # 确保并发数不超过 MAX_CONCURRENT_PAGES 或 max_pages
         concurrent_pages = min(search["max_concurrency"], max_pages)
-        # 使用 semaphore 来限制并发数
+        # 使用 semaphore 来限制并发数，每种排序各自限制
         semaphore = asyncio.Semaphore(concurrent_pages)
-        tasks = [fetch_with_semaphore(page) for page in range(max_pages)]
-
-        pages_content = await asyncio.gather(*tasks, return_exceptions=True)
-
         return [
-            product
-            for page_products in pages_content
-            if isinstance(page_products, list)
-            for product in page_products
+            asyncio.ensure_future(fetch_with_semaphore(page)) for page in range(max_pages)
         ]
 
     async def fetch_products(
         self, search, page: int, sort_type
     ) -> List[SearchResultItem]:
+        page_products, _ = await self.fetch_page(search, f"v1:{page}", sort_type)
+        return page_products
+
+    async def fetch_page(
+        self, search, page_token: str, sort_type
+    ) -> Tuple[List[SearchResultItem], Optional[str]]:
+        """
+        请求一页搜索结果。
+
+        :param page_token: 页码标识，第一页为 "v1:0"。
+        :return: (商品列表, 下一页的 pageToken)，没有下一页时为 None。
+        """
         try:
             serialized_data = json.dumps(
-                self.create_data(search, page, sort_type), ensure_ascii=False
+                self.create_data(search, page_token, sort_type), ensure_ascii=False
             ).encode("utf-8")
             response = await self.get_response("POST", data=serialized_data)
             if (response is None) or ("items" not in response):
-                return []  # 处理空响应或缺少项的情况
-
-            tasks = [self.create_product_from_card(item) for item in response["items"]]
-            products = await asyncio.gather(*tasks, return_exceptions=True)
+                return [], None  # 处理空响应或缺少项的情况
 
-            # 过滤掉异常对象
-            return [
-                product for product in products if isinstance(product, SearchResultItem)
-            ]
+            next_page_token = response.get("meta", {}).get("nextPageToken") or None
+            return await self.parse_items(response["items"]), next_page_token
         except Exception as e:
             # 处理可能的异常情况，例如网络错误或解析失败, 或者根据需要进行其他合适的错误处理
             logger.error(f"Error fetching products: {e}")
-            return []
+            return [], None
 
-    def create_data(self, search, page, sort_type):
+    def create_data(self, search, page_token, sort_type):
         return {
             # this seems to be random, but we'll add a prefix for mercari to track if they wanted to
             "userId": f"MERCARI_BOT_{uuid4()}",
             "pageSize": self.page_size,
-            "pageToken": f"v1:{page}",
+            "pageToken": page_token,
             # same thing as userId, courtesy of a prefix for mercari
             "searchSessionId": f"MERCARI_BOT_{uuid4()}",
             # this is hardcoded in their frontend currently, so leaving it
@@ -104,9 +193,9 @@ class MercariSearch(BaseSearch):
             "defaultDatasets": ["DATASET_TYPE_MERCARI", "DATASET_TYPE_BEYOND"],
         }
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         return "mercari"
 
-    async def get_item_status(self, item):
+    def get_item_status(self, item):
         status = 1 if item.get("status") == "ITEM_STATUS_ON_SALE" else 0
         return status
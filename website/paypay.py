@@ -1,10 +1,13 @@
 from math import ceil
 
+from common.utils.url_codec import paypay_product_url
+
 from .base.common_imports import *
 from .base.scraper import BaseScrapy
 
 
 class Paypay(BaseScrapy):
+    PARSES_MAX_PAGES = True  # 最大页数与商品在同一个响应中
 
     def __init__(self, http_client):
         super().__init__(
@@ -27,8 +30,7 @@ class Paypay(BaseScrapy):
             "itemStatus": getattr(search["filter"], "itemStatus", "open"),
         }
 
-    async def get_max_pages(self, search) -> int:
-        response = await self.get_response(search, 1)
+    async def parse_max_pages(self, response) -> int:
         data = json.loads(response) if response else {}
         return ceil(data.get("totalResultsAvailable", 0) / self.page_size)
 
@@ -36,23 +38,23 @@ class Paypay(BaseScrapy):
         data = json.loads(response) if response else {}
         return data.get("items", [])
 
-    async def get_item_id(self, item):
+    def get_item_id(self, item):
         return item.get("id")
 
-    async def get_item_name(self, item):
+    def get_item_name(self, item):
         return item.get("title")
 
-    async def get_item_price(self, item):
+    def get_item_price(self, item):
         return item.get("price")
 
-    async def get_item_image_url(self, item, id):
+    def get_item_image_url(self, item, id):
         return item.get("thumbnailImageUrl")
 
-    async def get_item_product_url(self, item, id):
-        return f"https://paypayfleamarket.yahoo.co.jp/item/{id}"
+    def get_item_product_url(self, item, id):
+        return paypay_product_url(id)
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         return "paypay"
 
-    async def get_item_status(self, item):
+    def get_item_status(self, item):
         return 1 if item.get("itemStatus") == "OPEN" else 0
@@ -2,11 +2,41 @@ import time
 from jose import jwt
 import os
 from datetime import datetime, timedelta
+from typing import Tuple
 from .base.common_imports import *
 from .base.scraper import BaseScrapy
 
 
+class PageCursor:
+    """Rennigou 按页码翻页的滑动窗口：下一个要请求的页码，以及 hasNext=false 确定的最后一页。"""
+
+    __slots__ = ("next_page", "last_page")
+
+    def __init__(self, max_pages: Optional[int] = None):
+        """
+        :param max_pages: 最多请求的页数，None 表示一直翻到最后一页。
+        """
+        self.next_page = 1
+        self.last_page = max_pages
+
+    def has_more(self) -> bool:
+        return self.last_page is None or self.next_page <= self.last_page
+
+    def take(self) -> int:
+        """取出下一个要请求的页码。"""
+        page = self.next_page
+        self.next_page += 1
+        return page
+
+    def end_at(self, page: int):
+        """记录最后一页，之后的页不再请求。"""
+        if self.last_page is None or page < self.last_page:
+            self.last_page = page
+
+
 class Rennigou(BaseScrapy):
+    MAX_CONSECUTIVE_FAILURES = 5  # 连续失败的页数达到此值时放弃本轮抓取
+
     def __init__(self, http_client):
         super().__init__(
             base_url="https://rl.rennigou.jp/supplier/search/index",
@@ -14,7 +44,6 @@ class Rennigou(BaseScrapy):
             http_client=http_client,
             method="POST",
         )
-        self.has_next = True
         self.issuer = "FQwcwtrHtmdxQ0aCKlQoxNMy9glEr4Zd"
         self.key = "OYZJEYvhNbwYG3WOecDzw8Mq8SixjD23"
         self.uid, self.token = "", ""
@@ -23,60 +52,84 @@ class Rennigou(BaseScrapy):
         self.uid, self.token = await self.login()
         self.create_headers()
 
-    async def search(
+    async def search_pages(
         self, search_term, iteration_count, user_max_pages
-    ) -> AsyncGenerator[SearchResultItem, None]:
-        max_concurrency = search_term.get(
-            "max_concurrency", 20
-        )  # 从search_term获取最大并发数，默认为10
-        semaphore = asyncio.Semaphore(max_concurrency)  # 使用信号量来限制并发数量
-
-        async def fetch_page(page_number):
-            async with semaphore:
-                return await self.fetch_products(search_term, page_number)
-
-        current_page = 1
-        tasks = []
-
-        # 当has_next为真且未达到iteration_count指定的页数限制时，继续创建任务
-        while self.has_next and (
-            iteration_count == 0 or current_page <= user_max_pages
-        ):
-            if iteration_count != 0 and current_page > user_max_pages:
-                break  # 达到user_max_pages限制时停止创建新任务
-
-            # 创建任务，直到达到并发限制或没有更多页面需要请求
-            while (
-                len(tasks) < max_concurrency
-                and (iteration_count == 0 or current_page <= user_max_pages)
-                and self.has_next
-            ):
-                tasks.append(fetch_page(current_page))
-                current_page += 1
-
-            # 使用asyncio.gather等待所有当前任务完成
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            tasks = []  # 重置任务列表以便下一批任务的创建
-
-            # 处理结果
-            for page_content in results:
-                if page_content is None:
-                    self.has_next = False
-                    break
-                for product in page_content:
-                    yield product
-
-            # 检查是否继续创建新任务
-            if not self.has_next or (
-                iteration_count != 0 and current_page > user_max_pages
-            ):
-                break
-
-        self.has_next = True  # 重置 has_next 以供下次搜索使用
+    ) -> AsyncGenerator[List[SearchResultItem], None]:
+        """
+        滑动窗口翻页：始终保持 max_concurrency 个页面请求在进行中，任意一页完成就补发下一页，
+        慢页不会让其他名额空闲。某一页返回 hasNext=false 后不再发出新请求，并取消之后的页。
+        请求失败的页被跳过，窗口继续向后移动；连续失败 MAX_CONSECUTIVE_FAILURES 页时抛出异常结束本轮，
+        避免首轮在服务不可用时无限翻页，也避免把不完整的结果当作完整的一轮。
+        """
+        window = search_term.get("max_concurrency", 20)
+        cursor = PageCursor(None if iteration_count == 0 else user_max_pages)
+        pages: Dict[asyncio.Future, int] = {}
+        failures = 0
+
+        def fill_window():
+            while len(pages) < window and cursor.has_more():
+                page = cursor.take()
+                pages[asyncio.ensure_future(self.fetch_page(search_term, page))] = page
+
+        try:
+            fill_window()
+            while pages:
+                done, _ = await asyncio.wait(pages, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page = pages.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.error(f"Failed to fetch page {page}: {e}")
+                        result = None
+                    if result is None:
+                        failures += 1
+                        if failures >= self.MAX_CONSECUTIVE_FAILURES:
+                            raise RuntimeError(
+                                f"连续 {failures} 页请求失败，停止本轮抓取"
+                            )
+                        continue
+                    failures = 0
+                    page_products, has_next = result
+                    if not has_next:
+                        cursor.end_at(page)
+                        # 取消最后一页之后的预取请求
+                        for pending, pending_page in list(pages.items()):
+                            if pending_page > page:
+                                pending.cancel()
+                                del pages[pending]
+                    if page_products:
+                        yield page_products
+                fill_window()
+        finally:
+            for task in pages:
+                task.cancel()
+
+    async def fetch_page(
+        self, search_term, page: int
+    ) -> Optional[Tuple[List[SearchResultItem], bool]]:
+        """
+        请求一页搜索结果。
+
+        :return: (商品列表, 是否还有下一页)，请求失败时返回 None。
+        """
+        response_text = await self.get_response(search_term, page)
+        if response_text is None:
+            logger.error(f"Failed to get response for page {page}'")
+            return None
+        parsed = self.parse_response(response_text)
+        if parsed is None:
+            logger.error(f"Invalid response for page {page}")
+            return None
+        items, has_next = parsed
+        return await self.parse_items(items), has_next
 
     async def get_max_pages(self, search) -> int:
         return 0
 
+    async def parse_max_pages(self, response) -> int:
+        return 0
+
     def create_jwt_token(self):
         current_time = time.time()
         if (
@@ -155,22 +208,29 @@ class Rennigou(BaseScrapy):
         return data
 
     async def get_response_items(self, response):
+        items, _ = self.parse_response(response) or ([], False)
+        return items
+
+    def parse_response(self, response) -> Optional[Tuple[list, bool]]:
+        """
+        解析一页响应。
+
+        :return: (商品列表, 是否还有下一页)，响应不是有效的 JSON 时返回 None。
+        """
         try:
             res = json.loads(response) if response else {}
         except json.JSONDecodeError:
-            return []
+            return None
         data = res.get("data", {})
-        items_list = data.get("list", [])
-        self.has_next = data.get("hasNext", False)  # 直接解析
-        return items_list
+        return data.get("list", []), data.get("hasNext", False)
 
-    async def get_item_id(self, item):
+    def get_item_id(self, item):
         return item.get("Id")
 
-    async def get_item_name(self, item):
+    def get_item_name(self, item):
         return item.get("Name")
 
-    async def get_item_price(self, item):
+    def get_item_price(self, item):
         def parse_price(price_str):
             try:
                 return int(price_str) if price_str else 0
@@ -190,17 +250,17 @@ class Rennigou(BaseScrapy):
 
         return price
 
-    async def get_item_image_url(self, item, id):
+    def get_item_image_url(self, item, id):
         return item.get("Thumbnail")
 
-    async def get_item_product_url(self, item, id):
+    def get_item_product_url(self, item, id):
         return item.get("link")
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         website = item.get("Source")
         return f"rennigou_{website}"
 
-    async def get_item_status(self, item):
+    def get_item_status(self, item):
         if item.get("Source") == "surugaya":
             left_tags = item.get("LeftTags")
             if left_tags and len(left_tags) > 0 and left_tags[0].get("name") == "缺货":
@@ -1,11 +1,28 @@
-from parsel import Selector
+from lxml import etree
 from urllib.parse import urlparse, parse_qs
 
+from common.utils.url_codec import suruga_image_url, suruga_product_url
+
 from .base.common_imports import *
+from .base.html_plan import css, first, parse_html
 from .base.scraper import BaseScrapy
 
+# 预编译的选择器
+HIT = css("div.hit")
+CARDS = css("div.item:has(div.item_detail)")
+TITLE = css("p.title a::text")
+LINK = css("p.title a::attr(href)")
+BRANCH_PRICE = css("div.item_price div p.mgnB5.mgnT5 span.text-red.fontS15 strong::text")
+TEIKA_PRICE = css("p.price_teika strong::text")
+OFFICIAL_STATUS = css("p.price::text")
+OTHER_STATUS = css("div.mgnT10.highlight-box strong::text")
+
 
 class Suruga(BaseScrapy):
+    INCREMENTAL_CRAWL = True  # 按上新时间倒序排列
+    PARSES_MAX_PAGES = True  # 最大页数与商品在同一个响应中
+    RESPONSE_BYTES = True  # 由 lxml 直接解析响应字节
+    OFFLOAD_PARSING = True  # 可以在解析进程池中解析
 
     def __init__(self, http_client):
         headers = {
@@ -54,46 +71,57 @@ class Suruga(BaseScrapy):
                 "inStock": "Off",  # 是否显示缺货商品，默认不显示
             }
 
-    async def get_max_pages(self, search) -> int:
-        res = await self.get_response(search, 1)
-        selector = Selector(res)
-        hit_text = selector.css("div.hit").get()
+    def is_newest_first(self, search_term) -> bool:
+        if "https" not in search_term["keyword"]:
+            return True
+        rank_by = self.get_param_value(search_term["keyword"], "rankBy")
+        return rank_by == "modificationTime:descending"
+
+    async def parse_max_pages(self, res) -> int:
+        return self.count_pages(parse_html(res))
+
+    def count_pages(self, root) -> int:
+        hits = HIT(root) if root is not None else []
+        hit_text = etree.tostring(hits[0], encoding="unicode") if hits else None
 
         # 使用正则表达式直接从 hit_text 中提取数字
         match = re.search(r"該当件数:(.+)件中", hit_text) if hit_text else None
         hit_number = match.group(1) if match else "0"
 
         # 将字符串转换为数字，计算最大页数
-        max_pages = await self.extract_number_from_content(hit_number, self.page_size)
+        max_pages = self.count_pages_in_text(hit_number, self.page_size)
         return max_pages or 0
 
     async def get_response_items(self, response):
-        selector = Selector(response)
-        return selector.css("div.item:has(div.item_detail)") if selector else []
+        return self.select_cards(response)
+
+    def select_cards(self, response):
+        root = parse_html(response)
+        return CARDS(root) if root is not None else []
 
-    async def get_item_name(self, item):
-        return item.css("p.title a::text").get()
+    def get_item_name(self, item):
+        return first(TITLE, item)
 
-    async def get_item_id(self, item):
-        product_link = item.css("p.title a::attr(href)").get()
+    def get_item_id(self, item):
+        product_link = first(LINK, item)
         match = re.search(r"product/(detail|other)/(\w+)", product_link)
         return match.group(2) if match else None
 
-    async def get_item_image_url(self, item, id):
-        return f"https://www.suruga-ya.jp/database/photo.php?shinaban={id}&size=m"
+    def get_item_image_url(self, item, id):
+        return suruga_image_url(id)
         # return item.css(".photo_box a img::attr(src)").get()
         # return f"https://www.suruga-ya.jp/database/pics_light/game/{id}.jpg"
 
-    async def get_item_product_url(self, item, id):
-        return f"https://www.suruga-ya.jp/product/other/{id}"
+    def get_item_product_url(self, item, id):
+        return suruga_product_url(id)
 
-    async def get_item_price(self, item):
+    def get_item_price(self, item):
         """
         Extracts and returns the minimum available price from a given item element.
         Handles different scenarios like regular price, out-of-stock, and price_teika.
 
         Args:
-        item (Selector): The selector object for the item from which the price is to be extracted.
+        item (etree._Element): The lxml element for the item from which the price is to be extracted.
 
         Returns:
         float: The lowest extracted price as a float, or 0 if no valid price is found.
@@ -118,20 +146,18 @@ class Suruga(BaseScrapy):
         prices = [
             extract_price(text)
             for text in [
-                item.css(
-                    "div.item_price div p.mgnB5.mgnT5 span.text-red.fontS15 strong::text"
-                ).get(),  # 分店价格
-                item.css("p.price_teika strong::text").get(),  # 本店价格
+                first(BRANCH_PRICE, item),  # 分店价格
+                first(TEIKA_PRICE, item),  # 本店价格
             ]
             if text
         ]
 
         return min(prices, default=0) if prices else 0
 
-    async def get_item_site(self, item):
+    def get_item_site(self, item):
         return "suruga"
 
-    async def get_item_status(self, item):
+    def get_item_status(self, item):
         """
         根据商品的可用性和定价信息确定商品状态。
 
@@ -143,11 +169,9 @@ class Suruga(BaseScrapy):
             None: 在所有其他情况下。
         """
 
-        official_status = item.css("p.price::text").get()  # 本店是否品切
+        official_status = first(OFFICIAL_STATUS, item)  # 本店是否品切
 
-        other_status = item.css(
-            "div.mgnT10.highlight-box strong::text"
-        ).get()  # 第三方店铺是否有货
+        other_status = first(OTHER_STATUS, item)  # 第三方店铺是否有货
 
         # 判断商品状态
         if official_status and not other_status: